@@ -3,10 +3,14 @@
 import json
 import os
 import sys
-import re
+import time
 from typing import Optional
-from github import Github
-import subprocess
+
+GITHUB_API = "https://api.github.com"
+GH_MAX_RETRIES = 5
+
+class GhRateLimited(RuntimeError):
+    """GitHub kept answering 429 after all retries."""
 
 def eprint(*args):
     print(*args, file=sys.stderr)
@@ -18,57 +22,84 @@ def read_event():
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def has_trigger_phrase_in_push(event: dict, phrase: str) -> bool:
-    if not phrase:
-        return False
-    pat = re.compile(re.escape(phrase), re.IGNORECASE)
-    for c in event.get("commits", []):
-        msg = c.get("message", "") or ""
-        if pat.search(msg):
-            return True
-    return False
-
-def first_subject_after_marker(event: dict, phrase: str) -> Optional[str]:
-    if not phrase:
-        return None
-    pat = re.compile(re.escape(phrase), re.IGNORECASE)
+def _strip_phrase(line: str, phrase_lower: str) -> str:
+    """Remove every case-insensitive occurrence of the phrase from `line`."""
+    lowered = line.lower()
+    parts = []
+    start = 0
+    i = lowered.find(phrase_lower)
+    while i != -1:
+        parts.append(line[start:i])
+        start = i + len(phrase_lower)
+        i = lowered.find(phrase_lower, start)
+    parts.append(line[start:])
+    return "".join(parts)
+
+def _scan_commits(event: dict, phrase_lower: str) -> tuple[bool, Optional[str]]:
+    """Find the first commit carrying the trigger phrase and derive a PR title from it."""
     for c in event.get("commits", []):
         msg = (c.get("message", "") or "").strip()
-        if pat.search(msg):
+        if phrase_lower in msg.lower():
             first_line = msg.splitlines()[0]
-            title = pat.sub("", first_line).strip(" :-–—")
-            return title or None
-    return None
-
-def ensure_pr(repo, owner_login: str, head_branch: str, base_branch: str, title: str, body: str) -> int:
+            title = _strip_phrase(first_line, phrase_lower).strip(" :-–—")
+            return True, title or None
+    return False, None
+
+def gh_request(session, method: str, path: str, **kwargs):
+    """Send a GitHub API request, backing off exponentially on 429."""
+    for attempt in range(GH_MAX_RETRIES):
+        resp = session.request(method, GITHUB_API + path, timeout=30, **kwargs)
+        if resp.status_code != 429:
+            resp.raise_for_status()
+            return resp
+        if attempt + 1 < GH_MAX_RETRIES:
+            delay = float(resp.headers.get("Retry-After") or 2 ** attempt)
+            eprint(f"[Agent] GitHub rate limit hit; retrying in {delay:.0f}s")
+            time.sleep(delay)
+    raise GhRateLimited(f"{method} {path} still rate limited after {GH_MAX_RETRIES} attempts")
+
+def ensure_pr(session, repo_full: str, owner_login: str, head_branch: str,
+              base_branch: str, title: str, body: str) -> int:
     # Dedup: if an open PR for this head already exists, reuse it
-    open_prs = repo.get_pulls(state="open", head=f"{owner_login}:{head_branch}")
-    for pr in open_prs:
-        return pr.number
-
-    pr = repo.create_pull(
-        title=title or f"{head_branch} → {base_branch}",
-        head=head_branch,
-        base=base_branch,
-        body=body or "Auto-created by AI PR Agent.",
-        draft=False,
-    )
-    return pr.number
-
-def call_ai_pr_assistant(pr_number: int):
-    env = os.environ.copy()
-    env["PR_NUMBER"] = str(pr_number)
-    # Point to your existing script
-    assistant_path = "scripts/ai_pr_assistant.py"
+    # Only the first open PR for this head is reused, so one item per page is enough
+    open_prs = gh_request(
+        session, "GET", f"/repos/{repo_full}/pulls",
+        params={"state": "open", "head": f"{owner_login}:{head_branch}", "per_page": 1},
+    ).json()
+    if open_prs:
+        return open_prs[0]["number"]
+
+    pr = gh_request(
+        session, "POST", f"/repos/{repo_full}/pulls",
+        json={
+            "title": title or f"{head_branch} → {base_branch}",
+            "head": head_branch,
+            "base": base_branch,
+            "body": body or "Auto-created by AI PR Agent.",
+            "draft": False,
+        },
+    ).json()
+    return pr["number"]
+
+def load_ai_pr_assistant():
+    # Point to your existing script; it runs in this interpreter, not a subprocess
+    assistant_dir = "scripts"
+    assistant_path = os.path.join(assistant_dir, "ai_pr_assistant.py")
     if not os.path.exists(assistant_path):
         eprint(f"ERROR: {assistant_path} not found.")
         sys.exit(1)
 
-    subprocess.run(
-        [sys.executable, assistant_path],
-        env=env,
-        check=True,
-    )
+    sys.path.insert(0, os.path.abspath(assistant_dir))
+    import ai_pr_assistant
+    return ai_pr_assistant
+
+
+def require_token() -> str:
+    gh_token = os.environ.get("PR_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if not gh_token:
+        eprint("Missing token: PR_TOKEN or GITHUB_TOKEN")
+        sys.exit(1)
+    return gh_token
 
 
 def main():
@@ -78,17 +109,6 @@ def main():
     phrase = os.environ.get("PR_TRIGGER_PHRASE", "PR Create")
     base_branch_env = os.environ.get("BASE_BRANCH", "").strip()
 
-    gh_token = os.environ.get("PR_TOKEN") or os.environ.get("GITHUB_TOKEN")
-    if not gh_token:
-        eprint("Missing token: PR_TOKEN or GITHUB_TOKEN")
-        sys.exit(1)
-
-    gh = Github(gh_token)
-    repo = gh.get_repo(repo_full)
-    owner_login = repo.owner.login
-    default_branch = repo.default_branch
-    base_branch = base_branch_env or default_branch
-
     event = read_event()
 
     if event_name == "pull_request":
@@ -97,26 +117,38 @@ def main():
             eprint("pull_request event without PR number?")
             sys.exit(0)
         print(f"[Agent] PR event detected → enrich PR #{pr_num}")
-        call_ai_pr_assistant(int(pr_num))
+        require_token()
+        load_ai_pr_assistant().run(int(pr_num))
         return
 
     if event_name == "push":
+        # Everything up to the trigger check comes from the env / push payload:
+        # a push that is filtered out needs neither a token nor an API call
+        owner_login = repo_full.split("/", 1)[0]
+        default_branch = event.get("repository", {}).get("default_branch") or "main"
+        base_branch = base_branch_env or default_branch
+
         # Ignore pushes to the base/default branch
         if head_branch in {base_branch, default_branch}:
             print(f"[Agent] Push to '{head_branch}' (base); skipping.")
             return
 
-        if not has_trigger_phrase_in_push(event, phrase):
+        hit, subject = _scan_commits(event, phrase.lower()) if phrase else (False, None)
+        if not hit:
             print(f"[Agent] No commit with trigger phrase '{phrase}' found; skipping.")
             return
 
-        title = first_subject_after_marker(event, phrase) or f"{head_branch} → {base_branch}"
+        title = subject or f"{head_branch} → {base_branch}"
 
         pr_body_placeholder = "<!-- AI_PR_DESC_BEGIN -->\n(Generating description…)\n<!-- AI_PR_DESC_END -->"
-        pr_num = ensure_pr(repo, owner_login, head_branch, base_branch, title, pr_body_placeholder)
-        print(f"[Agent] Using PR #{pr_num} for branch '{head_branch}'.")
-
-        call_ai_pr_assistant(pr_num)
+        # The assistant's session type (requests, with its retry policy) carries
+        # the PR lookup too, so the whole run shares one connection pool
+        assistant = load_ai_pr_assistant()
+        with assistant.github_session(require_token()) as session:
+            pr_num = ensure_pr(session, repo_full, owner_login, head_branch, base_branch, title, pr_body_placeholder)
+            print(f"[Agent] Using PR #{pr_num} for branch '{head_branch}'.")
+
+            assistant.run(pr_num, session=session)
         return
 
     print(f"[Agent] Event '{event_name}' not handled; nothing to do.")
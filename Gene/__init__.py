@@ -4,6 +4,16 @@ Gene Package Initialization
 Simple SQL query system for local database operations.
 """
 
+import os
+import sys
+
+# The modules import each other as top-level names, the way the CLI scripts load
+# them; put this directory on the path once so package imports and script imports
+# resolve to the same module objects instead of executing each file twice.
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+if _PACKAGE_DIR not in sys.path:
+    sys.path.insert(0, _PACKAGE_DIR)
+
 from config_local import LocalConfig, local_config
 from database_local import LocalDatabaseManager
 from query_engine import OpenAISQLEngine, create_openai_sql_engine
@@ -5,7 +5,11 @@ Configuration for local MySQL database connection.
 """
 
 import os
+import time
+import threading
 import mysql.connector
+import mysql.connector.pooling
+from functools import cached_property
 from typing import Optional, Dict, Any
 
 # Configuration uses hardcoded values - no .env file dependency
@@ -15,9 +19,11 @@ from typing import Optional, Dict, Any
 class LocalConfig:
     """Configuration management for local MySQL database connection."""
     
+    # Set your OpenAI API key here, or leave empty to use the environment variable
+    DEFAULT_OPENAI_API_KEY = ""
+    
     def __init__(self):
         # OpenAI Configuration (for OpenAI engine)
-        self.OPENAI_API_KEY = ""  # Set your OpenAI API key here or use environment variable
         self.OPENAI_MODEL = "gpt-4"  # or "gpt-3.5-turbo"
         
         # Local MySQL Database Configuration
@@ -30,25 +36,55 @@ class LocalConfig:
         # Connection settings
         self.CONNECTION_TIMEOUT = 30
         self.AUTOCOMMIT = True
+        self.POOL_NAME = "gene"
+        self.POOL_SIZE = 5
+        self.POOL_WAIT_TIMEOUT = 5  # seconds to wait for a free pooled connection
+        
+        # Connection pool, created on first connection request; the lock keeps
+        # the background schema thread and the caller from building two
+        self._pool = None
+        self._pool_lock = threading.Lock()
 
-    def get_database_connection(self) -> mysql.connector.MySQLConnection:
+    @cached_property
+    def OPENAI_API_KEY(self) -> str:
+        """OpenAI API key: the hardcoded value, else OPENAI_API_KEY read once from the environment."""
+        return self.DEFAULT_OPENAI_API_KEY or os.environ.get("OPENAI_API_KEY", "")
+    
+    def get_database_connection(self) -> mysql.connector.pooling.PooledMySQLConnection:
         """
-        Get a local MySQL database connection.
+        Get a local MySQL database connection from the shared pool.
+        
+        Calling close() on the returned connection hands it back to the pool.
+        When every pooled connection is in use, waits up to POOL_WAIT_TIMEOUT
+        seconds for one to be returned.
         
         Returns:
-            mysql.connector.MySQLConnection: Database connection object.
+            mysql.connector.pooling.PooledMySQLConnection: Database connection object.
         """
         try:
-            connection = mysql.connector.connect(
-                host=self.DB_HOST,
-                port=self.DB_PORT,
-                user=self.DB_USER,
-                password=self.DB_PASSWORD,
-                database=self.DB_NAME,
-                autocommit=self.AUTOCOMMIT,
-                connection_timeout=self.CONNECTION_TIMEOUT
-            )
-            return connection
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = mysql.connector.pooling.MySQLConnectionPool(
+                        pool_name=self.POOL_NAME,
+                        pool_size=self.POOL_SIZE,
+                        pool_reset_session=False,
+                        host=self.DB_HOST,
+                        port=self.DB_PORT,
+                        user=self.DB_USER,
+                        password=self.DB_PASSWORD,
+                        database=self.DB_NAME,
+                        autocommit=self.AUTOCOMMIT,
+                        connection_timeout=self.CONNECTION_TIMEOUT
+                    )
+            deadline = time.monotonic() + self.POOL_WAIT_TIMEOUT
+            while True:
+                try:
+                    return self._pool.get_connection()
+                except mysql.connector.errors.PoolError:
+                    # Pool exhausted: give other threads a moment to close theirs
+                    if time.monotonic() >= deadline:
+                        raise
+                    time.sleep(0.05)
         except mysql.connector.Error as e:
             raise ConnectionError(f"Failed to connect to local MySQL database: {e}")
     
@@ -4,11 +4,142 @@ Local Database Manager for Gene SQL Query System
 Handles MySQL database operations for local development environment.
 """
 
+import re
 import mysql.connector
-from typing import List, Dict, Any, Optional
+from mysql.connector import errorcode
+from typing import List, Dict, Any, Optional, FrozenSet, Iterator, Tuple
+from collections import defaultdict
 from contextlib import contextmanager
 from config_local import local_config
 
+# Leading keywords of statements that return a result set
+_READ_KINDS = frozenset({"SELECT", "SHOW", "DESCRIBE", "DESC", "EXPLAIN", "WITH"})
+
+# Keywords that make a statement write (or write files), wherever they appear
+_WRITE_KEYWORDS = frozenset({
+    "INSERT", "UPDATE", "DELETE", "REPLACE", "DROP", "ALTER", "CREATE", "TRUNCATE",
+    "RENAME", "GRANT", "REVOKE", "CALL", "LOAD", "INTO",
+})
+# Write keywords that are also read-only functions when followed by "("
+_FUNCTION_KEYWORDS = frozenset({"INSERT", "REPLACE", "TRUNCATE"})
+_SQL_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
+
+# Column types left out of table previews, and the widest preview projection
+LARGE_COLUMN_TYPES = frozenset({
+    "tinyblob", "blob", "mediumblob", "longblob",
+    "text", "mediumtext", "longtext", "json",
+})
+PREVIEW_MAX_COLUMNS = 20
+
+# Server version and current database for test_connection/get_database_info
+SERVER_INFO_SQL = "SELECT VERSION() AS version, DATABASE() AS current_db"
+
+# Every column of every table in a schema, replacing a DESCRIBE per table
+TABLE_COLUMNS_SQL = (
+    "SELECT TABLE_NAME AS table_name, COLUMN_NAME AS name, COLUMN_TYPE AS type, "
+    "IS_NULLABLE AS `null`, COLUMN_KEY AS `key`, COLUMN_DEFAULT AS `default`, "
+    "EXTRA AS extra "
+    "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s "
+    "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+)
+
+
+def sql_tokens(text: str, start: int = 0) -> Iterator[Tuple[str, int]]:
+    """
+    Scan MySQL text, skipping comments and the contents of quoted literals.
+    
+    Words come back uppercased and other characters one at a time; a quoted
+    string or identifier comes back as its quote character, and a /*! ... */
+    comment (which MySQL executes) as "/*!". Scanning stops at an
+    unterminated literal or comment.
+    
+    Args:
+        text (str): SQL text, possibly incomplete.
+        start (int): Offset to start scanning from.
+        
+    Yields:
+        Tuple[str, int]: Token and the offset just past it.
+    """
+    i, n = start, len(text)
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+        elif c in "'\"`":
+            j = i + 1
+            while j < n:
+                if text[j] == "\\" and c != "`":
+                    j += 2
+                elif text[j] == c and text.startswith(c, j + 1):
+                    j += 2
+                elif text[j] == c:
+                    break
+                else:
+                    j += 1
+            if j >= n:
+                return
+            i = j + 1
+            yield c, i
+        elif c == "#" or (text.startswith("--", i) and (i + 2 == n or text[i + 2].isspace())):
+            j = text.find("\n", i)
+            if j == -1:
+                return
+            i = j + 1
+        elif text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            if j == -1:
+                return
+            if text.startswith("/*!", i):
+                yield "/*!", j + 2
+            i = j + 2
+        else:
+            match = _SQL_WORD_RE.match(text, i)
+            if match:
+                i = match.end()
+                yield match.group().upper(), i
+            else:
+                i += 1
+                yield c, i
+
+
+def writes_data(tokens: List[str]) -> bool:
+    """
+    Return True if scanned tokens contain a keyword that writes data or files.
+    
+    Args:
+        tokens (List[str]): Tokens from sql_tokens.
+        
+    Returns:
+        bool: True for DML/DDL anywhere in the statement, including after a
+        WITH clause or EXPLAIN ANALYZE, and for SELECT ... INTO.
+    """
+    for index, token in enumerate(tokens):
+        if token not in _WRITE_KEYWORDS:
+            continue
+        if token in _FUNCTION_KEYWORDS and tokens[index + 1:index + 2] == ["("]:
+            continue
+        # SELECT ... FOR UPDATE is a locking read, not a write
+        if token == "UPDATE" and index and tokens[index - 1] == "FOR":
+            continue
+        return True
+    return False
+
+
+def is_read_query(query: str) -> bool:
+    """Return True if the statement produces a result set and modifies nothing."""
+    tokens = [token for token, _ in sql_tokens(query)]
+    if not tokens or tokens[0] not in _READ_KINDS:
+        return False
+    # SHOW and plain EXPLAIN only describe, whatever keywords follow
+    if tokens[0] == "SHOW" or (tokens[0] == "EXPLAIN" and tokens[1:2] != ["ANALYZE"]):
+        return True
+    return not writes_data(tokens)
+
+
+def _quote_identifier(name: str) -> str:
+    """Backtick-quote a MySQL identifier."""
+    return "`" + name.replace("`", "``") + "`"
+
 
 class LocalDatabaseManager:
     """Database manager for local MySQL database operations."""
@@ -17,6 +148,10 @@ class LocalDatabaseManager:
         """Initialize the local database manager."""
         self.config = local_config
         self.connection = None
+        self._table_info = None
+        self._tables = None
+        self._cursor = None
+        self._server_info = None
     
     @contextmanager
     def get_connection(self):
@@ -26,8 +161,13 @@ class LocalDatabaseManager:
             connection = self.config.get_database_connection()
             yield connection
         finally:
-            if connection and connection.is_connected():
-                connection.close()
+            # close() hands the connection back to the pool even if its link
+            # dropped; skipping it would leak the pool slot
+            if connection:
+                try:
+                    connection.close()
+                except mysql.connector.Error:
+                    pass
     
     def __enter__(self):
         """Enter context manager."""
@@ -36,8 +176,49 @@ class LocalDatabaseManager:
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Exit context manager."""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        # The shared cursor belongs to the connection being released
+        self._discard_cursor()
+        if self.connection:
+            try:
+                self.connection.close()
+            except mysql.connector.Error:
+                pass
+            self.connection = None
+    
+    def _get_cursor(self):
+        """Return the long-lived dictionary cursor for the current connection."""
+        if self._cursor is None:
+            self._cursor = self.connection.cursor(dictionary=True, buffered=False)
+        return self._cursor
+    
+    def _discard_cursor(self):
+        """Drop the shared cursor, e.g. after an error left it in an unknown state."""
+        if self._cursor is not None:
+            try:
+                self._cursor.close()
+            except mysql.connector.Error:
+                pass
+            self._cursor = None
+    
+    def _execute(self, operation: str, params: Optional[tuple] = None):
+        """
+        Run a statement on the shared cursor, reconnecting once if the link dropped.
+        
+        Only reads, or statements that never reached the server, are run again:
+        a write that lost its connection mid-query may already be committed.
+        """
+        cursor = self._get_cursor()
+        try:
+            cursor.execute(operation, params)
+        except mysql.connector.errors.OperationalError as e:
+            if e.errno != errorcode.CR_SERVER_GONE_ERROR and not is_read_query(operation):
+                self._discard_cursor()
+                raise
+            self._discard_cursor()
+            self.connection.reconnect()
+            cursor = self._get_cursor()
+            cursor.execute(operation, params)
+        return cursor
     
     def execute_query(self, query: str) -> List[Dict[str, Any]]:
         """
@@ -49,26 +230,52 @@ class LocalDatabaseManager:
         Returns:
             List[Dict[str, Any]]: Query results as list of dictionaries.
         """
-        if not self.connection or not self.connection.is_connected():
+        return list(self.execute_query_stream(query))
+    
+    def execute_query_stream(self, query: str) -> Iterator[Dict[str, Any]]:
+        """
+        Execute a SQL query and yield result rows as they are read.
+        
+        Rows come from an unbuffered cursor, so the full result set is never
+        held in memory. Statements that return no rows yield a single
+        {"affected_rows": n} dictionary.
+        
+        Args:
+            query (str): SQL query to execute.
+            
+        Yields:
+            Dict[str, Any]: One result row.
+        """
+        if not self.connection:
             raise RuntimeError("No active database connection. Use within context manager.")
         
-        cursor = self.connection.cursor(dictionary=True)
+        is_read = is_read_query(query)
+        
         try:
-            cursor.execute(query)
+            cursor = self._execute(query)
             
             # Handle different query types
-            if query.strip().upper().startswith(('SELECT', 'SHOW', 'DESCRIBE', 'EXPLAIN')):
-                results = cursor.fetchall()
-                return results if results else []
+            if is_read:
+                exhausted = False
+                try:
+                    for row in cursor:
+                        yield row
+                    exhausted = True
+                finally:
+                    # Caller stopped early: drain so the shared cursor can be reused
+                    if not exhausted:
+                        cursor.fetchall()
             else:
                 # For INSERT, UPDATE, DELETE, etc.
+                # Drain any rows so the shared cursor can be reused
+                if cursor.with_rows:
+                    cursor.fetchall()
                 self.connection.commit()
-                return [{"affected_rows": cursor.rowcount}]
+                yield {"affected_rows": cursor.rowcount}
                 
         except mysql.connector.Error as e:
+            self._discard_cursor()
             raise RuntimeError(f"SQL execution failed: {e}")
-        finally:
-            cursor.close()
     
     def get_table_info(self) -> Dict[str, List[Dict[str, str]]]:
         """
@@ -77,62 +284,136 @@ class LocalDatabaseManager:
         Returns:
             Dict[str, List[Dict[str, str]]]: Dictionary mapping table names to column info.
         """
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             raise RuntimeError("No active database connection. Use within context manager.")
         
-        cursor = self.connection.cursor(dictionary=True)
-        tables_info = {}
+        tables_info = defaultdict(list)
         
         try:
-            # Get all table names
-            cursor.execute("SHOW TABLES")
-            tables = cursor.fetchall()
-            
-            db_name = self.config.DB_NAME
-            table_key = f"Tables_in_{db_name}"
+            # One round-trip for every column of every table, in definition order
+            cursor = self._execute(TABLE_COLUMNS_SQL, (self.config.DB_NAME,))
             
-            for table_row in tables:
-                table_name = table_row[table_key]
-                
-                # Get column information for each table
-                cursor.execute(f"DESCRIBE {table_name}")
-                columns = cursor.fetchall()
-                
-                # Format column information
-                formatted_columns = []
-                for col in columns:
-                    formatted_columns.append({
-                        "name": col["Field"],
-                        "type": col["Type"],
-                        "null": col["Null"],
-                        "key": col["Key"],
-                        "default": col["Default"],
-                        "extra": col["Extra"]
-                    })
-                
-                tables_info[table_name] = formatted_columns
+            for col in cursor.fetchall():
+                table_name = col.pop("table_name")
+                tables_info[table_name].append(col)
                 
         except mysql.connector.Error as e:
+            self._discard_cursor()
             raise RuntimeError(f"Failed to get table info: {e}")
-        finally:
-            cursor.close()
         
-        return tables_info
+        return dict(tables_info)
+    
+    def get_table_names(self) -> FrozenSet[str]:
+        """
+        Get the names of all tables, cached after the first lookup.
+        
+        Returns:
+            FrozenSet[str]: Table names in the configured database.
+        """
+        self.get_cached_table_info()
+        return self._tables
+    
+    def get_cached_table_info(self) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Get table info, querying the database only on the first call.
+        
+        Returns:
+            Dict[str, List[Dict[str, str]]]: Dictionary mapping table names to column info.
+        """
+        if self._table_info is None:
+            self._table_info = self.get_table_info()
+            self._tables = frozenset(self._table_info)
+        return self._table_info
+    
+    def _find_table(self, table_name: str) -> str:
+        """
+        Match a table name against the known tables, ignoring case.
+        
+        The names are cached per manager, so on a miss they are reloaded once
+        in case the table was created after the first lookup.
+        
+        Args:
+            table_name (str): Table name as given by the caller.
+            
+        Returns:
+            str: The table's name as stored in the database.
+        """
+        for reload in (False, True):
+            if reload:
+                self._table_info = None
+            names = self.get_table_names()
+            if table_name in names:
+                return table_name
+            matches = [name for name in names if name.lower() == table_name.lower()]
+            if len(matches) == 1:
+                return matches[0]
+        raise ValueError(f"Unknown table: {table_name}")
+    
+    def _preview_sql(self, table_name: str, limit: str = "%s") -> str:
+        """Build the preview statement for a known table, skipping large columns."""
+        columns = [
+            col["name"] for col in self.get_cached_table_info()[table_name]
+            if col["type"].split("(", 1)[0].lower() not in LARGE_COLUMN_TYPES
+        ][:PREVIEW_MAX_COLUMNS]
+        projection = ", ".join(_quote_identifier(c) for c in columns) if columns else "*"
+        return f"SELECT {projection} FROM {_quote_identifier(table_name)} LIMIT {limit}"
+    
+    def get_table_preview_sql(self, table_name: str, limit: int = 5) -> str:
+        """
+        Get the statement get_table_preview runs for the same arguments.
+        
+        Args:
+            table_name (str): Table to preview; must be an existing table.
+            limit (int): Maximum number of rows to return.
+            
+        Returns:
+            str: Preview SQL with its LIMIT filled in.
+        """
+        return self._preview_sql(self._find_table(table_name), str(int(limit)))
+    
+    def get_table_preview(self, table_name: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Fetch the first rows of a table on the shared cursor.
+        
+        Only the first PREVIEW_MAX_COLUMNS columns that are not BLOB/TEXT/JSON
+        are selected, to keep large values off the wire.
+        
+        Args:
+            table_name (str): Table to preview; must be an existing table
+                (matched case-insensitively).
+            limit (int): Maximum number of rows to return.
+            
+        Returns:
+            List[Dict[str, Any]]: Preview rows as list of dictionaries.
+        """
+        if not self.connection:
+            raise RuntimeError("No active database connection. Use within context manager.")
+        
+        table_name = self._find_table(table_name)
+        
+        try:
+            return self._execute(self._preview_sql(table_name), (int(limit),)).fetchall()
+        except mysql.connector.Error as e:
+            self._discard_cursor()
+            raise RuntimeError(f"SQL execution failed: {e}")
     
     def test_connection(self) -> bool:
         """
         Test the database connection.
         
+        The server details fetched by the probe are kept for get_database_info.
+        
         Returns:
             bool: True if connection successful, False otherwise.
         """
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT 1")
-                result = cursor.fetchone()
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(SERVER_INFO_SQL)
+                rows = cursor.fetchall()
                 cursor.close()
-                return result[0] == 1
+                self._server_info = rows[0]
+                return True
         except Exception as e:
             print(f"Connection test failed: {e}")
             return False
@@ -144,35 +425,27 @@ class LocalDatabaseManager:
         Returns:
             Dict[str, Any]: Database information.
         """
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             raise RuntimeError("No active database connection. Use within context manager.")
         
-        cursor = self.connection.cursor(dictionary=True)
         info = {}
         
         try:
-            # Get database version
-            cursor.execute("SELECT VERSION() AS version")
-            version_result = cursor.fetchone()
-            info["mysql_version"] = version_result["version"]
+            # Database version and current database in one round-trip
+            if self._server_info is None:
+                self._server_info = self._execute(SERVER_INFO_SQL).fetchall()[0]
+            info["mysql_version"] = self._server_info["version"]
+            info["current_database"] = self._server_info["current_db"]
             
-            # Get current database
-            cursor.execute("SELECT DATABASE() AS current_db")
-            db_result = cursor.fetchone()
-            info["current_database"] = db_result["current_db"]
-            
-            # Get table count
-            cursor.execute("SHOW TABLES")
-            tables = cursor.fetchall()
-            info["table_count"] = len(tables)
+            # Table count from the cached table names
+            info["table_count"] = len(self.get_table_names())
             
             # Connection info
             info["connection"] = self.config.get_connection_info()
             
         except mysql.connector.Error as e:
+            self._discard_cursor()
             raise RuntimeError(f"Failed to get database info: {e}")
-        finally:
-            cursor.close()
         
         return info
 
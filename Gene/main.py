@@ -5,8 +5,10 @@ OpenAI Gene SQL Query System - Main Script
 Simple command-line interface for natural language SQL queries using direct OpenAI API.
 """
 
+import atexit
 import sys
 import os
+from itertools import groupby, islice
 
 # Add current directory to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,6 +17,8 @@ sys.path.insert(0, current_dir)
 from query_engine import create_openai_sql_engine
 from database_local import LocalDatabaseManager
 
+HISTORY_FILE = os.path.expanduser("~/.gene_history")
+
 
 def check_database_connection():
     """Check database connectivity."""
@@ -25,7 +29,7 @@ def check_database_connection():
         with db_manager:
             tables = db_manager.get_table_info()
             print(f"Connected to database successfully!")
-            print(f"Found {len(tables)} tables: {', '.join(list(tables.keys())[:5])}{'...' if len(tables) > 5 else ''}")
+            print(f"Found {len(tables)} tables: {', '.join(islice(tables, 5))}{'...' if len(tables) > 5 else ''}")
             return True
     except Exception as e:
         print(f"Database connection failed: {e}")
@@ -36,10 +40,9 @@ def check_openai_setup():
     print("Checking OpenAI API setup...")
     
     try:
-        from config_local import LocalConfig
-        config = LocalConfig()
+        from config_local import local_config
         
-        if config.OPENAI_API_KEY:
+        if local_config.OPENAI_API_KEY:
             print("OpenAI API key found")
             return True
         else:
@@ -51,6 +54,122 @@ def check_openai_setup():
         return False
 
 
+def _setup_history():
+    """Enable line editing and persistent history when readline is available."""
+    try:
+        import readline
+    except ImportError:
+        return
+    
+    try:
+        readline.read_history_file(HISTORY_FILE)
+    except OSError:
+        pass
+    
+    def save_history():
+        try:
+            readline.write_history_file(HISTORY_FILE)
+        except OSError:
+            pass
+    
+    atexit.register(save_history)
+
+
+def _create_engine():
+    """Create the OpenAI SQL engine, or return None if it cannot be initialized."""
+    try:
+        engine = create_openai_sql_engine()
+        print("OpenAI engine initialized")
+        return engine
+    except Exception as e:
+        print(f"❌ Failed to initialize OpenAI engine: {e}")
+        return None
+
+
+def _cmd_tables(engine):
+    results = engine.list_tables()
+    if results.get("success"):
+        tables = results.get("data", [])
+        print(f"Available tables ({len(tables)}): {', '.join(tables)}")
+    else:
+        print(f"Error listing tables: {results.get('error')}")
+
+
+def _cmd_preview(engine, table_name):
+    results = engine.get_table_preview(table_name, limit=5)
+    print(engine.format_results(results))
+
+
+def _cmd_sql(engine, sql_query):
+    results = engine.execute_sql_query(sql_query)
+    print(engine.format_results(results))
+
+
+def _cmd_natural(engine, user_input):
+    print("🔄 Processing with OpenAI...")
+    results = engine.execute_natural_query(user_input, verbose=True)
+    print(engine.format_results(results))
+
+
+# Whole-line commands and '<command> <argument>' commands of the interactive mode
+EXACT_COMMANDS = {'tables': _cmd_tables}
+PREFIX_COMMANDS = {'preview': _cmd_preview, 'sql': _cmd_sql}
+
+
+def _parse_command(user_input):
+    """Map an input line to (handler, args); the handler is None for natural language."""
+    lowered = user_input.lower()
+    command = lowered.partition(' ')[0]
+    argument = user_input[len(command):].strip()
+    
+    if lowered in EXACT_COMMANDS:
+        return EXACT_COMMANDS[lowered], ()
+    if argument and command in PREFIX_COMMANDS:
+        return PREFIX_COMMANDS[command], (argument,)
+    return None, (user_input,)
+
+
+def _run_piped_input(lines):
+    """
+    Run commands read from a non-interactive stdin.
+    
+    Commands run in input order, but each run of consecutive natural language
+    lines goes through one batch, so their OpenAI requests overlap.
+    """
+    commands = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.lower() == 'quit':
+            break
+        commands.append(_parse_command(line))
+    
+    if not commands:
+        return
+    
+    engine = _create_engine()
+    if engine is None:
+        return
+    
+    for is_natural, group in groupby(commands, key=lambda command: command[0] is None):
+        if is_natural:
+            queries = [args[0] for _, args in group]
+            print("🔄 Processing with OpenAI...")
+            for query, results in zip(queries, engine.execute_natural_queries_batch(queries)):
+                print(f"\n🤖 {query}")
+                if results.get("sql_query"):
+                    print(f"Generated SQL: {results['sql_query']}")
+                print(engine.format_results(results))
+            continue
+        
+        for handler, args in group:
+            try:
+                handler(engine, *args)
+            except Exception as e:
+                print(f"Error: {e}")
+
+
 def run_interactive_mode():
     print("OpenAI Gene SQL Query System - Interactive Mode")
     print("=" * 60)
@@ -66,14 +185,18 @@ def run_interactive_mode():
         print("❌ OpenAI setup incomplete. Exiting.")
         return
     
-    # Create OpenAI SQL engine
-    try:
-        engine = create_openai_sql_engine()
-        print("OpenAI engine initialized")
-    except Exception as e:
-        print(f"❌ Failed to initialize OpenAI engine: {e}")
+    if not sys.stdin.isatty():
+        _run_piped_input(sys.stdin.readlines())
         return
     
+    sys.stdout.reconfigure(line_buffering=True)
+    _setup_history()
+    
+    # Creating the engine starts loading the schema in the background, so do it
+    # before the first prompt: the load overlaps the user typing. A failed
+    # start is retried on the next command.
+    engine = _create_engine()
+    
     while True:
         try:
             user_input = input("\n🤖 Ask me (OpenAI): ").strip()
@@ -81,36 +204,22 @@ def run_interactive_mode():
             if not user_input:
                 continue
             
-            if user_input.lower() == 'quit':
+            lowered = user_input.lower()
+            if lowered == 'quit':
                 print("Goodbye!")
                 break
             
-            elif user_input.lower() == 'tables':
-                # List tables
-                results = engine.list_tables()
-                if results.get("success"):
-                    tables = results.get("data", [])
-                    print(f"Available tables ({len(tables)}): {', '.join(tables)}")
-                else:
-                    print(f"Error listing tables: {results.get('error')}")
-            
-            elif user_input.lower().startswith('preview '):
-                # Table preview
-                table_name = user_input[8:].strip()
-                results = engine.get_table_preview(table_name, limit=5)
-                print(engine.format_results(results))
-            
-            elif user_input.lower().startswith('sql '):
-                # Direct SQL query
-                sql_query = user_input[4:].strip()
-                results = engine.execute_sql_query(sql_query)
-                print(engine.format_results(results))
+            if engine is None:
+                engine = _create_engine()
+                if engine is None:
+                    continue
             
+            handler, args = _parse_command(user_input)
+            if handler is not None:
+                handler(engine, *args)
             else:
                 # Natural language query using OpenAI
-                print("🔄 Processing with OpenAI...")
-                results = engine.execute_natural_query(user_input, verbose=True)
-                print(engine.format_results(results))
+                _cmd_natural(engine, user_input)
         
         except KeyboardInterrupt:
             print("\n\nGoodbye!")
@@ -140,11 +249,14 @@ def run_example_queries():
         "Which employee has highest salary range?"
     ]
     
-    for i, query in enumerate(example_queries, 1):
+    print("🔄 Processing with OpenAI...")
+    batch_results = engine.execute_natural_queries_batch(example_queries)
+    
+    for i, (query, results) in enumerate(zip(example_queries, batch_results), 1):
         print(f"\n{i}. {query}")
         print("-" * 40)
-        print("🔄 Processing with OpenAI...")
-        results = engine.execute_natural_query(query, verbose=True)
+        if results.get("sql_query"):
+            print(f"Generated SQL: {results['sql_query']}")
         print(engine.format_results(results))
         
         if i < len(example_queries):
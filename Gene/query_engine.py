@@ -6,18 +6,317 @@ using direct OpenAI API calls.
 """
 
 import os
+import re
 import sys
+import time
 import json
-import requests
-from typing import Dict, Any, List, Optional
-from config_local import LocalConfig
-from database_local import LocalDatabaseManager
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+from config_local import local_config
+from database_local import LocalDatabaseManager, is_read_query, sql_tokens
+
+try:
+    import orjson
+    _json_dumps, _json_loads = orjson.dumps, orjson.loads
+except ImportError:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+    _json_loads = json.loads
+
+# Exact-match cache for read query results
+RESULT_CACHE_SIZE = 1024
+RESULT_CACHE_TTL = 60  # seconds
+
+# NL -> SQL cache keyed by query skeleton, backed by SQLite across runs
+NL_CACHE_SIZE = 10000
+NL_CACHE_DB = os.path.expanduser("~/.gene_cache/nl.db")
+NL_CACHE_TTL = 7 * 24 * 3600  # seconds, for the SQLite tier
+_QUOTED_RE = re.compile(r"'([^']*)'|\"([^\"]*)\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WORD_RE = re.compile(r"\w+")
+# Template placeholders, alone or inside a quoted SQL string/identifier
+_PLACEHOLDER_RE = re.compile(r"\{[en]\d+\}")
+_TEMPLATE_SLOT_RE = re.compile(
+    r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|`(?:[^`]|``)*`|\{[en]\d+\}", re.DOTALL
+)
+_BARE_VALUE_RE = re.compile(r"[\w$]+")
+
+# Optional ```/```sql/```mysql code fence around the model's SQL
+_FENCE_RE = re.compile(r"^\s*(?:```(?:sql|mysql)?)?\s*(.*?)\s*(?:```\s*)?$", re.DOTALL | re.IGNORECASE)
+
+# Concurrent OpenAI requests in execute_natural_queries_batch, and the number
+# of questions packed into each of them
+BATCH_WORKERS = 8
+BATCH_PROMPT_SIZE = 8
+
+# Appended to the system prompt when several questions share one request
+_BATCH_INSTRUCTIONS = """
+The user sends a JSON object mapping keys to questions. Reply with ONLY a JSON
+object mapping each key to the SQL query for its question, e.g. {"1": "SELECT ..."}.
+"""
+
+# System prompt for SQL generation; {schema} is the engine's schema context
+_PROMPT_TEMPLATE = """You are a MySQL expert. Convert the question to one MySQL query.
+
+Tables:
+{schema}
+
+Rules:
+1. Return ONLY the SQL query, no explanations
+2. Table and column names are case sensitive
+3. Use JOIN, GROUP BY and LIMIT where the question calls for them
+"""
+
+@lru_cache(maxsize=1)
+def _http_session():
+    """
+    Keep-alive session reused for every OpenAI request.
+    
+    requests is imported here rather than at module load, so SQL-only use of the
+    engine never loads it.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=frozenset(["POST"])
+        )
+    ))
+    session.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
+    return session
+
+
+def _sql_end(text: str) -> int:
+    """
+    Find where the SQL ends in a partial model reply.
+    
+    The SQL is complete at a closing code fence or at the first ';' outside
+    quoted literals and comments.
+    
+    Args:
+        text (str): Reply text received so far.
+        
+    Returns:
+        int: Index just past the end of the SQL, or -1 if it may still continue.
+    """
+    start = text.find("```")
+    if start != -1:
+        fence = text.find("```", start + 3)
+        if fence != -1:
+            return fence + 3
+        # Scan from the end of the opening fence line, not its backticks
+        start = text.find("\n", start)
+        if start == -1:
+            return -1
+    
+    for token, end in sql_tokens(text, max(start, 0)):
+        if token == ";":
+            return end
+    return -1
+
+
+def _generated_sql_error(sql_query: str) -> Optional[str]:
+    """
+    Check SQL produced for a natural language query before it reaches the database.
+    
+    Only a single read-only statement is accepted; direct SQL from
+    execute_sql_query is not restricted. Keywords are matched outside quoted
+    literals and comments, so writes hidden behind WITH or EXPLAIN ANALYZE,
+    SELECT ... INTO and locking reads are rejected too.
+    
+    Args:
+        sql_query (str): Generated (or cache-filled) SQL query.
+        
+    Returns:
+        Optional[str]: Why the SQL was rejected, or None if it may run.
+    """
+    if not sql_query.strip():
+        return "Model returned no SQL"
+    tokens = [token for token, _ in sql_tokens(sql_query)]
+    if (not is_read_query(sql_query) or "/*!" in tokens
+            or any(a == "FOR" and b in ("UPDATE", "SHARE") for a, b in zip(tokens, tokens[1:]))
+            or any(tokens[i:i + 3] == ["LOCK", "IN", "SHARE"] for i in range(len(tokens)))):
+        return f"Generated SQL is not a read-only query: {sql_query}"
+    if ";" in tokens[:-1]:
+        return f"Generated SQL contains more than one statement: {sql_query}"
+    return None
+
+
+def _fill_template(template: str, params: List[Tuple[str, str]]) -> Optional[str]:
+    """
+    Fill a cached SQL template with a query's values, escaped for where each placeholder sits.
+    
+    Inside a quoted string a value has quotes and backslashes escaped, inside
+    a backtick identifier backticks are doubled; a bare {nN} slot takes only
+    a number and a bare {eN} slot only a plain name. All placeholders are
+    replaced in one pass, so a value is never itself searched for placeholders.
+    
+    Args:
+        template (str): SQL with {eN}/{nN} placeholders.
+        params (List[Tuple[str, str]]): (placeholder, value) pairs.
+        
+    Returns:
+        Optional[str]: Filled SQL, or None if a value cannot go where its placeholder is.
+    """
+    values = dict(params)
+    
+    def value_for(name: str, quote: str) -> str:
+        value = values[name]
+        if name.startswith("{n") and not _NUMBER_RE.fullmatch(value):
+            raise ValueError(value)
+        if quote == "`":
+            return value.replace("`", "``")
+        if quote:
+            return value.replace("\\", "\\\\").replace(quote, quote * 2)
+        if not _BARE_VALUE_RE.fullmatch(value):
+            raise ValueError(value)
+        return value
+    
+    def fill(match) -> str:
+        text = match.group(0)
+        if text.startswith("{"):
+            return value_for(text, "") if text in values else text
+        return _PLACEHOLDER_RE.sub(
+            lambda m: value_for(m.group(0), text[0]) if m.group(0) in values else m.group(0), text
+        )
+    
+    try:
+        return _TEMPLATE_SLOT_RE.sub(fill, template)
+    except ValueError:
+        return None
+
+
+# Schema context shared by engines, persisted across runs
+SCHEMA_CACHE_TTL = 300  # seconds
+# Schema context, lowercased -> real names, table -> (prompt line, keywords)
+SchemaInfo = Tuple[str, Dict[str, str], Dict[str, Tuple[str, frozenset]]]
+
+# Schema linking: prompts carry only the best matching tables when a question
+# clearly names some of them
+SCHEMA_LINK_TOP_K = 5
+SCHEMA_LINK_MIN_SCORE = 2
+SCHEMA_CACHE_FILE = os.path.expanduser("~/.gene_cache/schema.json")
+
+
+def _schema_dsn() -> str:
+    """Identify the configured database without including its password."""
+    return f"{local_config.DB_USER}@{local_config.DB_HOST}:{local_config.DB_PORT}/{local_config.DB_NAME}"
+
+
+def _load_schema_file() -> Dict[str, Any]:
+    """Read the persisted DSN -> [stored_at, table_info] map, or {} if unreadable."""
+    try:
+        with open(SCHEMA_CACHE_FILE, "rb") as f:
+            entries = _json_loads(f.read())
+    except (OSError, ValueError):
+        return {}
+    return entries if isinstance(entries, dict) else {}
+
+
+def _save_schema_file(entries: Dict[str, Any]) -> None:
+    """Persist the schema map; failures only cost a cold start next time."""
+    try:
+        os.makedirs(os.path.dirname(SCHEMA_CACHE_FILE), exist_ok=True)
+        tmp_path = SCHEMA_CACHE_FILE + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_json_dumps(entries))
+        os.replace(tmp_path, SCHEMA_CACHE_FILE)
+    except (OSError, TypeError):
+        pass
+
+
+def _open_nl_db() -> Optional[sqlite3.Connection]:
+    """Open the persistent NL -> SQL cache, or return None if it is unavailable."""
+    try:
+        os.makedirs(os.path.dirname(NL_CACHE_DB), exist_ok=True)
+        db = sqlite3.connect(NL_CACHE_DB)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS nl(key TEXT PRIMARY KEY, dsn TEXT, sql TEXT, ts REAL)")
+        return db
+    except (OSError, sqlite3.Error):
+        return None
+
+
+@lru_cache(maxsize=4)
+def _schema_context_for(db_dsn: str, ttl_bucket: int) -> SchemaInfo:
+    """
+    Build the schema prompt text for a database.
+    
+    Table info comes from the persisted cache when it is younger than
+    SCHEMA_CACHE_TTL, otherwise from the database. `ttl_bucket` only keys the
+    in-process cache so that entries roll over every SCHEMA_CACHE_TTL seconds.
+    
+    Args:
+        db_dsn (str): Database identifier from _schema_dsn().
+        ttl_bucket (int): Current TTL period.
+        
+    Returns:
+        SchemaInfo: Schema context, schema names and per-table linking data.
+    """
+    entries = _load_schema_file()
+    stored_at, tables = entries.get(db_dsn, (0, None))
+    if tables is None or time.time() - stored_at > SCHEMA_CACHE_TTL:
+        db_manager = LocalDatabaseManager()
+        with db_manager:
+            tables = db_manager.get_table_info()
+        entries[db_dsn] = (time.time(), tables)
+        _save_schema_file(entries)
+    
+    return _render_schema(tables)
+
+
+def _load_schema_uncached() -> SchemaInfo:
+    """Build the schema prompt text straight from the database, bypassing every cache."""
+    db_manager = LocalDatabaseManager()
+    with db_manager:
+        return _render_schema(db_manager.get_table_info())
+
+
+def _keyword(word: str) -> str:
+    """Normalize a word for schema linking: lowercase, without a plural 's'."""
+    word = word.lower()
+    return word[:-1] if len(word) > 3 and word.endswith("s") else word
+
+
+def _render_schema(tables: Dict[str, List[Dict[str, str]]]) -> SchemaInfo:
+    """Render table info into schema context, schema names and per-table linking data."""
+    # Compact one-line-per-table form: table(col1, col2, ...), in a fixed table
+    # order so the prompt (and NL cache keys derived from it) stay stable
+    links = {}
+    for table_name, columns in sorted(tables.items()):
+        names = [table_name] + [col['name'] for col in columns]
+        keywords = frozenset(
+            _keyword(part) for name in names for part in [name] + name.split("_") if part
+        )
+        links[table_name] = (f"{table_name}({', '.join(names[1:])})", keywords)
+    
+    schema_names = {
+        name.lower(): name
+        for table_name, columns in tables.items()
+        for name in [table_name] + [col['name'] for col in columns]
+    }
+    return "\n".join(line for line, _ in links.values()), schema_names, links
 
 
 class OpenAISQLEngine:
     """SQL query engine that converts natural language to SQL using direct OpenAI API."""
     
-    def __init__(self, api_key: str = None, model: str = "gpt-4", use_ai: bool = True):
+    def __init__(self, api_key: str = None, model: str = "gpt-4", use_ai: bool = True,
+                 use_schema_cache: bool = True):
         """
         Initialize the OpenAI SQL engine.
         
@@ -25,45 +324,146 @@ class OpenAISQLEngine:
             api_key (str): OpenAI API key. If None, will try to get from environment.
             model (str): OpenAI model to use (default: gpt-4).
             use_ai (bool): Whether to use AI for query generation.
+            use_schema_cache (bool): Whether to reuse the shared/persisted schema cache.
         """
         self.db_manager = LocalDatabaseManager()
         self.use_ai = use_ai
-        
-        # Setup OpenAI configuration - prioritize config file over environment
-        local_config = LocalConfig()
+        self.use_schema_cache = use_schema_cache
         
         # Priority: explicit parameter > config file > environment variable
-        if api_key:
-            self.api_key = api_key
-        elif local_config.OPENAI_API_KEY:
-            self.api_key = local_config.OPENAI_API_KEY
-        else:
-            self.api_key = os.getenv('OPENAI_API_KEY')
+        self.api_key = api_key or local_config.OPENAI_API_KEY
             
         self.model = model
         self.api_url = "https://api.openai.com/v1/chat/completions"
         
+        # Request fields besides "messages", serialized without the opening brace
+        self._request_options = _json_dumps({
+            "model": self.model,
+            "max_tokens": 500,
+            "temperature": 0.1,
+            "stream": True,
+            # End generation at the closing fence; ';' is left to _sql_end,
+            # which does not cut inside literals or comments. A blank line is
+            # not a stop: formatted SQL may contain one.
+            "stop": ["\n```"]
+        })[1:]
+        
+        # OpenAI request headers; the API key is fixed for the engine's lifetime
+        self._headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        
         if self.use_ai and not self.api_key:
             print("Warning: OpenAI API key not found. Set OPENAI_API_KEY environment variable or pass api_key parameter.")
             self.use_ai = False
         
-        # Get database schema for context
-        self.schema_context = ""
-        self._build_schema_context()
+        # SQL text -> (stored_at, columns, rows); pinned entries never expire
+        self._result_cache = OrderedDict()
+        self._pinned = set()
+        
+        # Query skeleton -> SQL template, and lowercased schema names -> real names
+        self._nl_cache = OrderedDict()
+        self._schema_names = {}
+        self._schema_links = {}
+        self._nl_db = _open_nl_db()
+        
+        # Database schema for context, loaded in the background so construction
+        # does not wait on the database; first use blocks until it is ready
+        self._schema_context = None
+        self._schema_lock = threading.Lock()
+        if self.use_ai:
+            threading.Thread(target=self._build_schema_context, daemon=True).start()
+    
+    @property
+    def schema_context(self) -> str:
+        """Schema context string for AI queries, loaded on first access."""
+        self._ensure_schema()
+        return self._schema_context
+    
+    def _ensure_schema(self) -> None:
+        """Load the schema context and derived prompt unless already loaded."""
+        if self._schema_context is None:
+            self._build_schema_context()
     
     def _build_schema_context(self) -> None:
         """Build schema context string for AI queries."""
-        try:
-            with self.db_manager:
-                tables = self.db_manager.get_table_info()
-                schema_parts = []
-                for table_name, columns in tables.items():
-                    column_info = [f"{col['name']} ({col['type']})" for col in columns]
-                    schema_parts.append(f"Table {table_name}: {', '.join(column_info)}")
-                
-                self.schema_context = "Available tables and columns:\n" + "\n".join(schema_parts)
-        except Exception as e:
-            self.schema_context = f"Error loading schema: {e}"
+        with self._schema_lock:
+            if self._schema_context is not None:
+                return
+            try:
+                if self.use_schema_cache:
+                    ttl_bucket = int(time.time() // SCHEMA_CACHE_TTL)
+                    schema_context, self._schema_names, self._schema_links = _schema_context_for(_schema_dsn(), ttl_bucket)
+                else:
+                    schema_context, self._schema_names, self._schema_links = _load_schema_uncached()
+            except Exception as e:
+                schema_context = f"Error loading schema: {e}"
+                self._schema_links = {}
+            schema_context = sys.intern(schema_context)
+            self._system_prompt = _PROMPT_TEMPLATE.format(schema=schema_context)
+            # The system message is serialized once and spliced into each request
+            self._system_message = _json_dumps({"role": "system", "content": self._system_prompt})
+            self._schema_context = schema_context
+    
+    def invalidate_schema(self) -> None:
+        """
+        Reload the schema after DDL changes.
+        
+        Drops the shared in-process and on-disk schema caches for this database,
+        along with SQL and results cached against the old schema.
+        """
+        _schema_context_for.cache_clear()
+        entries = _load_schema_file()
+        if entries.pop(_schema_dsn(), None) is not None:
+            _save_schema_file(entries)
+        
+        self._nl_cache.clear()
+        if self._nl_db is not None:
+            try:
+                with self._nl_db:
+                    self._nl_db.execute("DELETE FROM nl WHERE dsn = ?", (_schema_dsn(),))
+            except sqlite3.Error:
+                pass
+        self._result_cache.clear()
+        with self._schema_lock:
+            self._schema_context = None
+        self._build_schema_context()
+    
+    def _link_tables(self, natural_query: str) -> Optional[List[str]]:
+        """
+        Pick the tables a question most likely refers to.
+        
+        Tables are scored by how many of their name/column keywords appear in
+        the question.
+        
+        Args:
+            natural_query (str): Natural language query.
+            
+        Returns:
+            Optional[List[str]]: Up to SCHEMA_LINK_TOP_K tables, or None when the
+            full schema should be sent (small schema or no clear match).
+        """
+        self._ensure_schema()
+        if len(self._schema_links) <= SCHEMA_LINK_TOP_K:
+            return None
+        
+        words = {_keyword(word) for word in _WORD_RE.findall(natural_query)}
+        scores = sorted(
+            ((len(keywords & words), table_name) for table_name, (_, keywords) in self._schema_links.items()),
+            reverse=True
+        )
+        if scores[0][0] < SCHEMA_LINK_MIN_SCORE:
+            return None
+        return sorted(table_name for score, table_name in scores[:SCHEMA_LINK_TOP_K] if score)
+    
+    def _system_message_for(self, natural_query: str) -> bytes:
+        """Serialized system message, restricted to the linked tables when there are any."""
+        tables = self._link_tables(natural_query)  # also ensures the schema is loaded
+        if tables is None:
+            return self._system_message
+        schema = "\n".join(self._schema_links[table_name][0] for table_name in tables)
+        return _json_dumps({"role": "system", "content": _PROMPT_TEMPLATE.format(schema=schema)})
     
     def _generate_sql_with_openai(self, natural_query: str) -> str:
         """
@@ -78,68 +478,43 @@ class OpenAISQLEngine:
         if not self.api_key:
             raise Exception("OpenAI API key not available")
         
-        # Prepare system prompt
-        system_prompt = f"""You are a MySQL expert. Convert natural language queries to SQL.
-
-{self.schema_context}
-
-Rules:
-1. Return ONLY the SQL query, no explanations
-2. Use proper MySQL syntax
-3. Table and column names are case sensitive
-4. If the query is unclear, make reasonable assumptions based on the schema
-5. For aggregations, include appropriate GROUP BY clauses
-6. Use JOIN when querying multiple tables
-7. Use LIMIT for large result sets when appropriate
-
-Example:
-Natural: "How many users are there?"
-SQL: SELECT COUNT(*) as user_count FROM users
-"""
+        import requests
         
-        # Prepare request headers
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        }
+        self._ensure_schema()
         
-        # Prepare request data
-        data = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Convert this to SQL: {natural_query}"}
-            ],
-            "max_tokens": 500,
-            "temperature": 0.1
-        }
+        # Prepare request data from the pre-serialized system message and options
+        user_message = _json_dumps({"role": "user", "content": f"Convert this to SQL: {natural_query}"})
+        data = b'{"messages":[' + self._system_message_for(natural_query) + b"," + user_message + b"]," + self._request_options
         
         try:
-            # Make API request
-            response = requests.post(
+            # Make API request, streaming the reply as server-sent events
+            with _http_session().post(
                 self.api_url,
-                headers=headers,
-                data=json.dumps(data),
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
-            
-            response_data = response.json()
-            
-            # Extract SQL query
-            sql_query = response_data['choices'][0]['message']['content'].strip()
+                headers=self._headers,
+                data=data,
+                timeout=(3.05, 30),
+                stream=True
+            ) as response:
+                if response.status_code != 200:
+                    raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
+                
+                # Stop reading once the SQL is complete; the model may pad it with prose
+                sql_query = ""
+                for line in response.iter_lines():
+                    if not line.startswith(b"data: "):
+                        continue
+                    payload = line[6:]
+                    if payload == b"[DONE]":
+                        break
+                    for choice in _json_loads(payload)['choices']:
+                        sql_query += choice['delta'].get('content') or ""
+                    end = _sql_end(sql_query)
+                    if end != -1:
+                        sql_query = sql_query[:end]
+                        break
             
             # Clean up the SQL query (remove code blocks if present)
-            if sql_query.startswith('```sql'):
-                sql_query = sql_query[6:]
-            if sql_query.startswith('```'):
-                sql_query = sql_query[3:]
-            if sql_query.endswith('```'):
-                sql_query = sql_query[:-3]
-            
-            return sql_query.strip()
+            return _FENCE_RE.match(sql_query).group(1)
             
         except requests.exceptions.RequestException as e:
             raise Exception(f"Network error calling OpenAI API: {e}")
@@ -148,6 +523,129 @@ SQL: SELECT COUNT(*) as user_count FROM users
         except Exception as e:
             raise Exception(f"Error generating SQL with OpenAI: {e}")
     
+    def _skeletonize(self, natural_query: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        Reduce a natural language query to its structural skeleton.
+        
+        Quoted strings, numbers and schema table/column names are replaced with
+        placeholders, so rephrasings that differ only in those values share a key.
+        
+        Args:
+            natural_query (str): Natural language query.
+            
+        Returns:
+            Tuple[str, List[Tuple[str, str]]]: Skeleton and (placeholder, value) pairs.
+        """
+        self._ensure_schema()
+        params = []
+        
+        def placeholder(kind: str, value: str) -> str:
+            name = f"{{{kind}{len(params) + 1}}}"
+            params.append((name, value))
+            return name
+        
+        def entity(match) -> str:
+            word = match.group(0)
+            name = self._schema_names.get(word)
+            return placeholder("e", name) if name else word
+        
+        text = _QUOTED_RE.sub(
+            lambda m: placeholder("e", m.group(1) if m.group(1) is not None else m.group(2)),
+            natural_query
+        )
+        text = " ".join(text.lower().split()).rstrip("?.! ")
+        text = _NUMBER_RE.sub(lambda m: placeholder("n", m.group(0)), text)
+        text = _WORD_RE.sub(entity, text)
+        return text, params
+    
+    def _cached_sql(self, skeleton: str, params: List[Tuple[str, str]]) -> Optional[str]:
+        """Look up SQL for a skeleton, filling the cached template with this query's values."""
+        exact_key = skeleton + "\0" + "\0".join(value for _, value in params)
+        for key in (exact_key, skeleton):
+            sql_query = self._nl_cache.get(key)
+            if sql_query is None:
+                sql_query = self._load_nl(key)
+                if sql_query is not None:
+                    self._put_nl(key, sql_query)
+            if sql_query is not None:
+                self._nl_cache.move_to_end(key)
+                if key is skeleton:
+                    return _fill_template(sql_query, params)
+                return sql_query
+        return None
+    
+    def _remember_sql(self, skeleton: str, params: List[Tuple[str, str]], sql_query: str) -> None:
+        """
+        Cache generated SQL under its skeleton as a template.
+        
+        If the query's values cannot be located unambiguously in the SQL, or hold
+        quote characters or backslashes the SQL would have had to escape, the SQL
+        is cached for this exact query only.
+        """
+        template = sql_query
+        if (len({value for _, value in params}) != len(params)
+                or any(c in value for _, value in params for c in "'\"`\\")):
+            template = None
+        for name, value in params:
+            if template is None:
+                break
+            pattern = re.compile(r"(?<!\w)" + re.escape(value) + r"(?!\w)")
+            template, count = pattern.subn(lambda m: name, template)
+            # A value found more than once (e.g. an id of 1 next to LIMIT 1) is ambiguous
+            if count != 1:
+                template = None
+        
+        if template is not None:
+            key, value = skeleton, template
+        else:
+            key, value = skeleton + "\0" + "\0".join(v for _, v in params), sql_query
+        self._put_nl(key, value)
+        self._save_nl(key, value)
+    
+    def _put_nl(self, key: str, sql_query: str) -> None:
+        """Insert into the in-memory NL cache, evicting the least recently used entry."""
+        self._nl_cache[key] = sql_query
+        self._nl_cache.move_to_end(key)
+        if len(self._nl_cache) > NL_CACHE_SIZE:
+            self._nl_cache.popitem(last=False)
+    
+    def _nl_db_key(self, key: str) -> str:
+        """
+        Persistent cache key: a hash of the database, model, schema and in-memory key.
+        
+        Including the model and schema makes entries written under a different
+        model or before a schema change miss instead of returning stale SQL.
+        """
+        self._ensure_schema()
+        return hashlib.sha1(
+            f"{_schema_dsn()}\0{self.model}\0{self._schema_context}\0{key}".encode()
+        ).hexdigest()
+    
+    def _load_nl(self, key: str) -> Optional[str]:
+        """Read unexpired SQL from the persistent NL cache; errors count as a miss."""
+        if self._nl_db is None:
+            return None
+        try:
+            row = self._nl_db.execute("SELECT sql, ts FROM nl WHERE key = ?", (self._nl_db_key(key),)).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or time.time() - row[1] > NL_CACHE_TTL:
+            return None
+        return row[0]
+    
+    def _save_nl(self, key: str, sql_query: str) -> None:
+        """Write SQL to the persistent NL cache; errors only lose the warm start."""
+        if self._nl_db is None:
+            return
+        try:
+            with self._nl_db:
+                self._nl_db.execute(
+                    "INSERT OR REPLACE INTO nl(key, dsn, sql, ts) VALUES (?, ?, ?, ?)",
+                    (self._nl_db_key(key), _schema_dsn(), sql_query, time.time())
+                )
+        except sqlite3.Error:
+            pass
+    
     def execute_natural_query(self, natural_query: str, verbose: bool = False) -> Dict[str, Any]:
         """
         Execute a natural language query by converting it to SQL first.
@@ -166,12 +664,32 @@ SQL: SELECT COUNT(*) as user_count FROM users
                 "data": None
             }
         
+        if not natural_query or not natural_query.strip():
+            return {
+                "success": False,
+                "error": "Empty natural language query",
+                "data": None,
+                "natural_query": natural_query
+            }
+        
         try:
-            # Generate SQL using OpenAI
-            sql_query = self._generate_sql_with_openai(natural_query)
+            skeleton, params = self._skeletonize(natural_query)
+            sql_query = self._cached_sql(skeleton, params)
             
-            if verbose:
-                print(f"Generated SQL: {sql_query}")
+            generated = sql_query is None
+            if generated:
+                # Generate SQL using OpenAI
+                sql_query = self._generate_sql_with_openai(natural_query)
+                if verbose:
+                    print(f"Generated SQL: {sql_query}")
+            elif verbose:
+                print(f"Cached SQL: {sql_query}")
+            
+            error = _generated_sql_error(sql_query)
+            if error:
+                return self._rejected_sql_result(error, sql_query, natural_query)
+            if generated:
+                self._remember_sql(skeleton, params, sql_query)
             
             # Execute the generated SQL
             return self.execute_sql_query(sql_query, natural_query)
@@ -184,6 +702,173 @@ SQL: SELECT COUNT(*) as user_count FROM users
                 "natural_query": natural_query
             }
     
+    def execute_natural_queries_batch(self, natural_queries: List[str], verbose: bool = False) -> List[Dict[str, Any]]:
+        """
+        Execute several natural language queries, overlapping their OpenAI calls.
+        
+        SQL for cache misses is generated concurrently, with up to
+        BATCH_PROMPT_SIZE questions packed into each OpenAI request; each query
+        is executed against the database as soon as its SQL is ready, in input
+        order.
+        
+        Args:
+            natural_queries (List[str]): Natural language queries.
+            verbose (bool): Whether to show generated SQL.
+            
+        Returns:
+            List[Dict[str, Any]]: Query results with metadata, one per query.
+        """
+        if not self.use_ai:
+            return [self.execute_natural_query(query) for query in natural_queries]
+        
+        results = []
+        with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+            pending = []
+            misses = {}
+            for natural_query in natural_queries:
+                if not natural_query or not natural_query.strip():
+                    pending.append((natural_query, None, None, None, None))
+                    continue
+                skeleton, params = self._skeletonize(natural_query)
+                sql_query = self._cached_sql(skeleton, params)
+                # Repeated questions in one batch share a single generation
+                key = (skeleton, tuple(params))
+                if sql_query is None:
+                    misses.setdefault(key, natural_query)
+                pending.append((natural_query, skeleton, params, sql_query, key))
+            
+            # Pack up to BATCH_PROMPT_SIZE questions into each request
+            futures = {}
+            miss_items = list(misses.items())
+            for start in range(0, len(miss_items), BATCH_PROMPT_SIZE):
+                chunk = miss_items[start:start + BATCH_PROMPT_SIZE]
+                if len(chunk) == 1:
+                    futures[chunk[0][0]] = (pool.submit(self._generate_sql_with_openai, chunk[0][1]), None, None)
+                    continue
+                future = pool.submit(self._generate_sql_batch, [query for _, query in chunk])
+                for index, (key, _) in enumerate(chunk):
+                    futures[key] = (future, index, chunk)
+            
+            generated = {}
+            for natural_query, skeleton, params, sql_query, key in pending:
+                if key is None:
+                    results.append(self.execute_natural_query(natural_query))
+                    continue
+                try:
+                    if sql_query is None:
+                        if key not in generated:
+                            generated[key] = self._batch_result(pool, futures, key)
+                            if not _generated_sql_error(generated[key]):
+                                self._remember_sql(skeleton, params, generated[key])
+                        sql_query = generated[key]
+                        if verbose:
+                            print(f"Generated SQL: {sql_query}")
+                    elif verbose:
+                        print(f"Cached SQL: {sql_query}")
+                    
+                    error = _generated_sql_error(sql_query)
+                    if error:
+                        results.append(self._rejected_sql_result(error, sql_query, natural_query))
+                        continue
+                    
+                    results.append(self.execute_sql_query(sql_query, natural_query))
+                    
+                except Exception as e:
+                    results.append({
+                        "success": False,
+                        "error": f"Error processing natural language query: {e}",
+                        "data": None,
+                        "natural_query": natural_query
+                    })
+        
+        return results
+    
+    def _generate_sql_batch(self, natural_queries: List[str]) -> Dict[int, str]:
+        """
+        Generate SQL for several questions with a single OpenAI request.
+        
+        Args:
+            natural_queries (List[str]): Natural language queries.
+            
+        Returns:
+            Dict[int, str]: SQL by position in `natural_queries`; questions the
+            reply did not answer are missing.
+        """
+        import requests
+        
+        self._ensure_schema()
+        
+        keyed = {str(index + 1): query for index, query in enumerate(natural_queries)}
+        data = _json_dumps({
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self._system_prompt + _BATCH_INSTRUCTIONS},
+                {"role": "user", "content": _json_dumps(keyed).decode()}
+            ],
+            "max_tokens": 300 * len(natural_queries),
+            "temperature": 0.1
+        })
+        
+        try:
+            response = _http_session().post(self.api_url, headers=self._headers, data=data, timeout=(3.05, 60))
+            if response.status_code != 200:
+                raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
+            
+            content = _json_loads(response.content)['choices'][0]['message']['content']
+            answers = _json_loads(content[content.find("{"):content.rfind("}") + 1])
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Network error calling OpenAI API: {e}")
+        except (KeyError, ValueError) as e:
+            raise Exception(f"Unexpected OpenAI API response format: {e}")
+        
+        return {
+            int(key) - 1: _FENCE_RE.match(sql_query).group(1)
+            for key, sql_query in answers.items()
+            if key in keyed and isinstance(sql_query, str) and sql_query.strip()
+        }
+    
+    def _batch_result(self, pool: ThreadPoolExecutor, futures: Dict[Any, Tuple], key: Any) -> str:
+        """
+        Take one query's SQL from its generation future.
+        
+        Questions a batched reply left out, or whose batch request failed, are
+        all regenerated individually and concurrently as soon as the reply is in.
+        
+        Args:
+            pool (ThreadPoolExecutor): Pool running the batch's requests.
+            futures (Dict[Any, Tuple]): Query key -> (future, index in chunk, chunk).
+            key (Any): Key of the query to resolve.
+            
+        Returns:
+            str: Generated SQL query.
+        """
+        future, index, chunk = futures[key]
+        if index is None:
+            return future.result()
+        
+        try:
+            answers = future.result()
+        except Exception:
+            answers = {}
+        for position, (other_key, query) in enumerate(chunk):
+            if position not in answers and futures[other_key][0] is future:
+                futures[other_key] = (pool.submit(self._generate_sql_with_openai, query), None, None)
+        
+        if index in answers:
+            return answers[index]
+        return futures[key][0].result()
+    
+    @staticmethod
+    def _rejected_sql_result(error: str, sql_query: str, natural_query: str) -> Dict[str, Any]:
+        """Result for generated SQL that failed validation and was not executed."""
+        return {
+            "success": False,
+            "error": error,
+            "sql_query": sql_query,
+            "natural_query": natural_query,
+            "data": None
+        }
+    
     def execute_sql_query(self, sql_query: str, natural_query: str = None) -> Dict[str, Any]:
         """
         Execute a SQL query directly.
@@ -195,16 +880,110 @@ SQL: SELECT COUNT(*) as user_count FROM users
         Returns:
             Dict[str, Any]: Query results with metadata.
         """
+        is_read = is_read_query(sql_query)
+        cache_key = self._result_key(sql_query)
+        
+        results = self._cached_rows(cache_key) if is_read else None
+        if results is not None:
+            return {
+                "success": True,
+                "data": results,
+                "sql_query": sql_query,
+                "natural_query": natural_query,
+                "row_count": len(results),
+                "cached": True
+            }
+        
         try:
             with self.db_manager:
                 results = self.db_manager.execute_query(sql_query)
+            
+            if is_read:
+                self._store_rows(cache_key, results)
+            else:
+                # Any write may change what cached reads would return
+                self._result_cache.clear()
+            
+            return {
+                "success": True,
+                "data": results,
+                "sql_query": sql_query,
+                "natural_query": natural_query,
+                "row_count": len(results) if results else 0,
+                "cached": False
+            }
+                
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Database error: {e}",
+                "sql_query": sql_query,
+                "natural_query": natural_query,
+                "data": None
+            }
+    
+    @staticmethod
+    def _result_key(sql_query: str) -> str:
+        """Result-cache key: the SQL text without surrounding blanks or a trailing ';'."""
+        return sql_query.strip().rstrip(";").rstrip()
+    
+    def _cached_rows(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return a fresh copy of cached rows for `cache_key`, or None on a miss."""
+        entry = self._result_cache.get(cache_key)
+        if entry is None:
+            return None
+        
+        stored_at, columns, rows = entry
+        if cache_key not in self._pinned and time.monotonic() - stored_at > RESULT_CACHE_TTL:
+            del self._result_cache[cache_key]
+            return None
+        
+        self._result_cache.move_to_end(cache_key)
+        return [dict(zip(columns, row)) for row in rows]
+    
+    def _store_rows(self, cache_key: str, results: List[Dict[str, Any]]) -> None:
+        """Cache rows as immutable tuples, evicting the least recently used entry."""
+        columns = tuple(results[0]) if results else ()
+        rows = tuple(tuple(row.values()) for row in results)
+        self._result_cache[cache_key] = (time.monotonic(), columns, rows)
+        self._result_cache.move_to_end(cache_key)
+        
+        if len(self._result_cache) > RESULT_CACHE_SIZE:
+            for key in self._result_cache:
+                if key not in self._pinned:
+                    del self._result_cache[key]
+                    break
+    
+    def pin_result(self, sql_query: str) -> None:
+        """
+        Keep the result of a read query cached regardless of age.
+        
+        Pinned results are still dropped when a write goes through the engine,
+        and are cached again on their next execution.
+        
+        Args:
+            sql_query (str): SQL query whose result should stay cached.
+        """
+        self._pinned.add(self._result_key(sql_query))
+    
+    def clear_result_cache(self) -> None:
+        """Drop every cached query result."""
+        self._result_cache.clear()
+    
+    def get_table_preview(self, table_name: str, limit: int = 5) -> Dict[str, Any]:
+        """Get a preview of table data, reporting the statement that actually ran."""
+        sql_query = None
+        try:
+            with self.db_manager:
+                results = self.db_manager.get_table_preview(table_name, limit)
+                sql_query = self.db_manager.get_table_preview_sql(table_name, limit)
                 
                 return {
                     "success": True,
                     "data": results,
                     "sql_query": sql_query,
-                    "natural_query": natural_query,
-                    "row_count": len(results) if results else 0
+                    "natural_query": None,
+                    "row_count": len(results)
                 }
                 
         except Exception as e:
@@ -212,15 +991,10 @@ SQL: SELECT COUNT(*) as user_count FROM users
                 "success": False,
                 "error": f"Database error: {e}",
                 "sql_query": sql_query,
-                "natural_query": natural_query,
+                "natural_query": None,
                 "data": None
             }
     
-    def get_table_preview(self, table_name: str, limit: int = 5) -> Dict[str, Any]:
-        """Get a preview of table data."""
-        sql_query = f"SELECT * FROM {table_name} LIMIT {limit}"
-        return self.execute_sql_query(sql_query)
-    
     def list_tables(self) -> Dict[str, Any]:
         """List all tables in the database."""
         try:
@@ -253,26 +1027,32 @@ SQL: SELECT COUNT(*) as user_count FROM users
         if not display_data:
             return "No results to display."
         
-        # Get column names
-        columns = list(display_data[0].keys())
+        # Get column names and stringify every cell once; rows with the same
+        # keys in the same order (any DB result) are converted without lookups
+        columns = tuple(display_data[0].keys())
+        cells = [
+            list(map(str, row.values())) if tuple(row) == columns
+            else [str(row.get(col, '')) for col in columns]
+            for row in display_data
+        ]
         
         # Calculate column widths
-        col_widths = {}
-        for col in columns:
-            col_widths[col] = max(len(str(col)), max(len(str(row.get(col, ''))) for row in display_data))
+        col_widths = [
+            max(len(str(col)), max(map(len, column)))
+            for col, column in zip(columns, zip(*cells))
+        ]
         
-        # Format table
+        # Format table with one left-aligned template shared by every line
+        row_format = " | ".join(f"{{:<{width}}}" for width in col_widths)
         lines = []
         
         # Header
-        header = " | ".join(str(col).ljust(col_widths[col]) for col in columns)
+        header = row_format.format(*map(str, columns))
         lines.append(header)
         lines.append("-" * len(header))
         
         # Data rows
-        for row in display_data:
-            row_str = " | ".join(str(row.get(col, '')).ljust(col_widths[col]) for col in columns)
-            lines.append(row_str)
+        lines.extend(row_format.format(*row_cells) for row_cells in cells)
         
         result = "\n".join(lines)
         
@@ -286,7 +1066,8 @@ SQL: SELECT COUNT(*) as user_count FROM users
         return result
 
 
-def create_openai_sql_engine(api_key: str = None, model: str = "gpt-4", use_ai: bool = True) -> OpenAISQLEngine:
+def create_openai_sql_engine(api_key: str = None, model: str = "gpt-4", use_ai: bool = True,
+                             use_schema_cache: bool = True) -> OpenAISQLEngine:
     """
     Factory function to create an OpenAI SQL engine.
     
@@ -294,11 +1075,12 @@ def create_openai_sql_engine(api_key: str = None, model: str = "gpt-4", use_ai:
         api_key (str): OpenAI API key. If None, will try to get from environment.
         model (str): OpenAI model to use (default: gpt-4).
         use_ai (bool): Whether to use AI for query generation.
+        use_schema_cache (bool): Whether to reuse the shared/persisted schema cache.
         
     Returns:
         OpenAISQLEngine: Configured OpenAI SQL engine.
     """
-    return OpenAISQLEngine(api_key=api_key, model=model, use_ai=use_ai)
+    return OpenAISQLEngine(api_key=api_key, model=model, use_ai=use_ai, use_schema_cache=use_schema_cache)
 
 
 # Example usage
@@ -6,16 +6,34 @@ Supports runtime queries via command line arguments
 
 import sys
 import os
+import re
 import argparse
 import json
-from typing import List, Optional
+from contextlib import nullcontext, redirect_stdout
+from itertools import groupby, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 # Add current directory to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
 from query_engine import create_openai_sql_engine
-from database_local import LocalDatabaseManager
+from database_local import LocalDatabaseManager, is_read_query
+
+try:
+    import orjson
+    
+    def _json_line(record: dict) -> str:
+        return orjson.dumps(record, default=str).decode()
+except ImportError:
+    def _json_line(record: dict) -> str:
+        return json.dumps(record, default=str)
+
+# Leading keywords that mark a query as direct SQL rather than natural language
+_SQL_PREFIX_RE = re.compile(r'^\s*(?:SELECT|INSERT|UPDATE|DELETE|SHOW|DESCRIBE|WITH)\b', re.IGNORECASE)
+QUIT_COMMANDS = frozenset(['quit', 'exit', 'q'])
+# Most consecutive NL queries sent to the engine as one batch
+BATCH_CHUNK_SIZE = 64
 
 
 def test_database_connection():
@@ -64,7 +82,8 @@ def test_direct_sql_query(engine, sql_query: Optional[str] = None, tables_dict:
         # Use default query if no custom query provided
         if tables_dict:
             sample_table = list(tables_dict.keys())[0]
-            sql_query = f"SELECT COUNT(*) as record_count FROM {sample_table}"
+            quoted_table = "`" + sample_table.replace("`", "``") + "`"
+            sql_query = f"SELECT COUNT(*) as record_count FROM {quoted_table}"
             print(f"   Executing default query: {sql_query}")
         else:
             print("❌ No query provided and no tables available for default query")
@@ -112,6 +131,30 @@ def test_natural_language_query(engine, nl_query: Optional[str] = None, tables_d
         return False
 
 
+def _run_sql(engine, sql_query: str, label: str):
+    """Execute and print a direct SQL query for the interactive mode."""
+    print(f"\n🔄 {label} SQL: {sql_query}")
+    try:
+        result = engine.execute_sql_query(sql_query)
+        print(f"✅ Result: {engine.format_results(result)}")
+    except Exception as e:
+        print(f"❌ SQL Error: {e}")
+
+
+def _run_nl(engine, nl_query: str, label: str):
+    """Execute and print a natural language query for the interactive mode."""
+    print(f"\n🔄 {label} NL: {nl_query}")
+    try:
+        result = engine.execute_natural_query(nl_query, verbose=True)
+        print(f"✅ Result: {engine.format_results(result)}")
+    except Exception as e:
+        print(f"❌ NL Error: {e}")
+
+
+# 'sql:' / 'nl:' query prefixes of the interactive mode
+QUERY_PREFIXES = {'sql': _run_sql, 'nl': _run_nl}
+
+
 def run_interactive_query_test(engine):
     """Run interactive query testing mode."""
     print("\n🎮 Interactive Query Test Mode")
@@ -127,47 +170,21 @@ def run_interactive_query_test(engine):
         try:
             query = input("Query> ").strip()
             
-            if query.lower() in ['quit', 'exit', 'q']:
+            lowered = query.lower()
+            if lowered in QUIT_COMMANDS:
                 print("👋 Exiting interactive mode")
                 break
             
             if not query:
                 continue
             
-            if query.lower().startswith('sql:'):
-                sql_query = query[4:].strip()
-                print(f"\n🔄 Executing SQL: {sql_query}")
-                try:
-                    result = engine.execute_sql_query(sql_query)
-                    print(f"✅ Result: {engine.format_results(result)}")
-                except Exception as e:
-                    print(f"❌ SQL Error: {e}")
-            
-            elif query.lower().startswith('nl:'):
-                nl_query = query[3:].strip()
-                print(f"\n🔄 Executing NL: {nl_query}")
-                try:
-                    result = engine.execute_natural_query(nl_query, verbose=True)
-                    print(f"✅ Result: {engine.format_results(result)}")
-                except Exception as e:
-                    print(f"❌ NL Error: {e}")
-            
+            prefix, sep, _ = lowered.partition(':')
+            if sep and prefix in QUERY_PREFIXES:
+                QUERY_PREFIXES[prefix](engine, query[len(prefix) + 1:].strip(), "Executing")
+            elif _SQL_PREFIX_RE.match(query):
+                _run_sql(engine, query, "Auto-detected")
             else:
-                # Auto-detect query type
-                if query.upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'SHOW', 'DESCRIBE')):
-                    print(f"\n🔄 Auto-detected SQL: {query}")
-                    try:
-                        result = engine.execute_sql_query(query)
-                        print(f"✅ Result: {engine.format_results(result)}")
-                    except Exception as e:
-                        print(f"❌ SQL Error: {e}")
-                else:
-                    print(f"\n🔄 Auto-detected NL: {query}")
-                    try:
-                        result = engine.execute_natural_query(query, verbose=True)
-                        print(f"✅ Result: {engine.format_results(result)}")
-                    except Exception as e:
-                        print(f"❌ NL Error: {e}")
+                _run_nl(engine, query, "Auto-detected")
                         
         except (KeyboardInterrupt, EOFError):
             print("\n👋 Exiting interactive mode")
@@ -176,37 +193,93 @@ def run_interactive_query_test(engine):
             print(f"❌ Unexpected error: {e}")
 
 
-def run_batch_query_test(engine, queries: List[str]):
-    """Run batch query testing."""
-    print(f"\n📊 Batch Query Test - {len(queries)} queries")
-    print("=" * 40)
+def iter_query_file(path: str) -> Iterator[str]:
+    """Yield the queries in a file one line at a time, skipping blanks and comments."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            query = line.strip()
+            if query and not query.startswith('#'):
+                yield query
+
+
+def _run_distinct(engine, is_sql: bool, chunk: List[str]) -> List[Tuple[Optional[dict], Optional[Exception]]]:
+    """
+    Run each distinct query in a chunk once and fan the outcome back out.
     
-    results = []
-    for i, query in enumerate(queries, 1):
-        print(f"\n--- Query {i}/{len(queries)} ---")
-        
+    Returns one (result, error) pair per query position. Non-read SQL is never
+    collapsed, since repeating a write is not the same as running it once.
+    """
+    if not is_sql:
+        distinct = list(dict.fromkeys(chunk))
         try:
-            # Auto-detect query type
-            if query.upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'SHOW', 'DESCRIBE')):
-                print(f"SQL: {query}")
-                result = engine.execute_sql_query(query)
-                print(f"✅ Success: {engine.format_results(result)}")
-                results.append({"query": query, "type": "sql", "success": True, "result": result})
-            else:
-                print(f"NL: {query}")
-                result = engine.execute_natural_query(query, verbose=False)
-                print(f"✅ Success: {engine.format_results(result)}")
-                results.append({"query": query, "type": "nl", "success": True, "result": result})
-                
+            outcomes = {query: (result, None) for query, result in zip(distinct, engine.execute_natural_queries_batch(distinct))}
         except Exception as e:
-            print(f"❌ Failed: {e}")
-            results.append({"query": query, "type": "unknown", "success": False, "error": str(e)})
+            outcomes = {query: (None, e) for query in distinct}
+        return [outcomes[query] for query in chunk]
+    
+    outcomes = {}
+    ordered = []
+    for query in chunk:
+        key = query if is_read_query(query) else object()
+        if key not in outcomes:
+            try:
+                outcomes[key] = (engine.execute_sql_query(query), None)
+            except Exception as e:
+                outcomes[key] = (None, e)
+        ordered.append(outcomes[key])
+    return ordered
+
+
+def run_batch_query_test(engine, queries: Iterable[str], json_output: bool = False) -> Dict[str, int]:
+    """
+    Run batch query testing, consuming the queries lazily.
+    
+    With json_output, each query is written to stdout as one JSON line and the
+    results are not formatted as tables; the summary goes to stderr.
+    """
+    if not json_output:
+        print("\n📊 Batch Query Test")
+        print("=" * 40)
+    
+    total = 0
+    successful = 0
+    duplicates = 0
+    # Auto-detect query type; consecutive NL queries are generated in batches
+    for is_sql, run in groupby(queries, key=lambda query: _SQL_PREFIX_RE.match(query) is not None):
+        while True:
+            chunk = list(islice(run, BATCH_CHUNK_SIZE))
+            if not chunk:
+                break
+            outcomes = _run_distinct(engine, is_sql, chunk)
+            duplicates += len(chunk) - len({id(outcome) for outcome in outcomes})
+            
+            for query, (result, error) in zip(chunk, outcomes):
+                total += 1
+                successful += error is None
+                
+                if json_output:
+                    record = {"query": query, "type": "sql" if is_sql else "nl"}
+                    if error is None:
+                        record["result"] = result
+                    else:
+                        record["error"] = str(error)
+                    sys.stdout.write(_json_line(record) + "\n")
+                    continue
+                
+                print(f"\n--- Query {total} ---")
+                print(f"{'SQL' if is_sql else 'NL'}: {query}")
+                if error is None:
+                    print(f"✅ Success: {engine.format_results(result)}")
+                else:
+                    print(f"❌ Failed: {error}")
     
     # Summary
-    successful = sum(1 for r in results if r["success"])
-    print(f"\n📈 Batch Results: {successful}/{len(queries)} successful")
+    out = sys.stderr if json_output else sys.stdout
+    print(f"\n📈 Batch Results: {successful}/{total} successful", file=out)
+    if duplicates:
+        print(f"🔁 Skipped {duplicates}/{total} duplicate queries ({duplicates / total:.0%})", file=out)
     
-    return results
+    return {"total": total, "successful": successful, "duplicates": duplicates}
 
 
 def quick_test():
@@ -261,6 +334,7 @@ Examples:
     parser.add_argument('--interactive', action='store_true', help='Run in interactive mode')
     parser.add_argument('--batch', nargs='+', help='Run multiple queries in batch')
     parser.add_argument('--file', type=str, help='Load queries from file (one per line)')
+    parser.add_argument('--json', action='store_true', help='Write batch/file results as JSON lines')
     parser.add_argument('--verbose', action='store_true', help='Verbose output')
     
     args = parser.parse_args()
@@ -270,9 +344,10 @@ Examples:
         return quick_test()
     
     try:
-        # Initialize engine
-        engine = test_engine_creation()
-        tables_dict = test_table_listing(engine) if args.verbose else {}
+        # Initialize engine; in JSON mode its progress output goes to stderr
+        with redirect_stdout(sys.stderr) if args.json else nullcontext():
+            engine = test_engine_creation()
+            tables_dict = test_table_listing(engine) if args.verbose else {}
         
         # Handle different modes
         if args.interactive:
@@ -285,21 +360,17 @@ Examples:
             test_natural_language_query(engine, args.nl)
         
         elif args.batch:
-            run_batch_query_test(engine, args.batch)
+            run_batch_query_test(engine, args.batch, json_output=args.json)
         
         elif args.file:
             if not os.path.exists(args.file):
                 print(f"❌ File not found: {args.file}")
                 return False
             
-            with open(args.file, 'r', encoding='utf-8') as f:
-                queries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-            
-            if not queries:
+            summary = run_batch_query_test(engine, iter_query_file(args.file), json_output=args.json)
+            if not summary["total"]:
                 print(f"❌ No queries found in file: {args.file}")
                 return False
-            
-            run_batch_query_test(engine, queries)
         
         else:
             print("❌ No valid option provided. Use --help for usage information.")
@@ -0,0 +1,87 @@
+"""Tests for Gene/database_local.py (run with `python -m unittest discover Gene/tests`)."""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import database_local
+except ImportError as e:  # mysql-connector not installed
+    database_local = None
+    IMPORT_ERROR = str(e)
+else:
+    IMPORT_ERROR = ""
+
+
+@unittest.skipIf(database_local is None, f"database_local unavailable: {IMPORT_ERROR}")
+class FindTableTest(unittest.TestCase):
+    def setUp(self):
+        self.manager = database_local.LocalDatabaseManager()
+        self.schemas = [{"employees": []}, {"employees": [], "Orders": []}]
+        self.loads = 0
+
+        def get_table_info():
+            self.loads += 1
+            return self.schemas[min(self.loads, len(self.schemas)) - 1]
+        self.manager.get_table_info = get_table_info
+
+    def test_matches_case_insensitively(self):
+        self.schemas = [{"Employees": []}]
+        self.assertEqual(self.manager._find_table("employees"), "Employees")
+        self.assertEqual(self.loads, 1)
+
+    def test_reloads_names_once_on_a_miss(self):
+        self.assertEqual(self.manager._find_table("employees"), "employees")
+        self.assertEqual(self.manager._find_table("orders"), "Orders")
+        self.assertEqual(self.loads, 2)
+
+    def test_unknown_table_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.manager._find_table("missing")
+
+
+@unittest.skipIf(database_local is None, f"database_local unavailable: {IMPORT_ERROR}")
+class PreviewSqlTest(unittest.TestCase):
+    def test_reports_projection_and_requested_limit(self):
+        manager = database_local.LocalDatabaseManager()
+        manager.get_table_info = lambda: {
+            "Employees": [{"name": "id", "type": "int(11)"}, {"name": "bio", "type": "text"}],
+        }
+        self.assertEqual(manager.get_table_preview_sql("employees", 7), "SELECT `id` FROM `Employees` LIMIT 7")
+
+
+@unittest.skipIf(database_local is None, f"database_local unavailable: {IMPORT_ERROR}")
+class ExecuteRetryTest(unittest.TestCase):
+    def setUp(self):
+        self.manager = database_local.LocalDatabaseManager()
+        self.manager.connection = mock.Mock()
+        self.cursor = mock.Mock()
+        self.manager._get_cursor = lambda: self.cursor
+
+    def lose_connection(self, errno):
+        error = database_local.mysql.connector.errors.OperationalError(errno=errno)
+        self.cursor.execute.side_effect = [error, None]
+
+    def test_read_is_retried_after_lost_connection(self):
+        self.lose_connection(2013)
+        self.manager._execute("SELECT 1")
+        self.manager.connection.reconnect.assert_called_once()
+        self.assertEqual(self.cursor.execute.call_count, 2)
+
+    def test_write_lost_mid_query_is_not_retried(self):
+        self.lose_connection(2013)
+        with self.assertRaises(database_local.mysql.connector.errors.OperationalError):
+            self.manager._execute("UPDATE t SET a = 1")
+        self.assertEqual(self.cursor.execute.call_count, 1)
+
+    def test_write_that_never_reached_the_server_is_retried(self):
+        self.lose_connection(2006)
+        self.manager._execute("UPDATE t SET a = 1")
+        self.assertEqual(self.cursor.execute.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""Tests for Gene/query_engine.py (run with `python -m unittest discover Gene/tests`)."""
+
+import os
+import sys
+import tempfile
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import query_engine
+    from database_local import is_read_query
+except ImportError as e:  # mysql-connector / requests not installed
+    query_engine = None
+    IMPORT_ERROR = str(e)
+else:
+    IMPORT_ERROR = ""
+
+
+@unittest.skipIf(query_engine is None, f"query_engine unavailable: {IMPORT_ERROR}")
+class GeneratedSqlGuardTest(unittest.TestCase):
+    def assertRejected(self, sql):
+        self.assertIsNotNone(query_engine._generated_sql_error(sql), sql)
+
+    def assertAccepted(self, sql):
+        self.assertIsNone(query_engine._generated_sql_error(sql), sql)
+
+    def test_accepts_reads(self):
+        self.assertAccepted("SELECT name FROM employees WHERE dept = 'R;D'")
+        self.assertAccepted("SELECT REPLACE(name, 'a', 'b'), TRUNCATE(salary, 0) FROM employees;")
+        self.assertAccepted("WITH x AS (SELECT id FROM employees) SELECT * FROM x")
+        self.assertAccepted("SELECT `update` FROM t WHERE note = 'delete me' -- drop\n")
+        self.assertAccepted("SHOW CREATE TABLE employees")
+
+    def test_rejects_writes_behind_read_keywords(self):
+        self.assertRejected("WITH x AS (SELECT id FROM t) DELETE FROM t WHERE id IN (SELECT id FROM x)")
+        self.assertRejected("WITH x AS (SELECT 1) UPDATE t SET a = 1")
+        self.assertRejected("SELECT * FROM employees INTO OUTFILE '/tmp/out.csv'")
+        self.assertRejected("SELECT * FROM employees FOR UPDATE")
+        self.assertRejected("SELECT * FROM employees LOCK IN SHARE MODE")
+        self.assertRejected("EXPLAIN ANALYZE DELETE FROM employees")
+        self.assertRejected("SELECT 1 /*!50000 , (DELETE FROM t) */")
+
+    def test_rejects_second_statement_after_quoted_semicolon(self):
+        self.assertRejected('SELECT ";"; DROP TABLE t')
+        self.assertRejected("SELECT `a;b` FROM t; SELECT 1")
+        self.assertRejected("SELECT 'it\\'s;'; SELECT 1")
+        self.assertRejected("SELECT 1 /* ';' */; SELECT 2")
+        self.assertRejected("SELECT 1 -- ';'\n; SELECT 2")
+
+    def test_is_read_query_sees_past_leading_keyword(self):
+        self.assertTrue(is_read_query("SELECT * FROM t FOR UPDATE"))
+        self.assertFalse(is_read_query("WITH x AS (SELECT 1) DELETE FROM t"))
+        self.assertFalse(is_read_query("SELECT * INTO OUTFILE '/tmp/x' FROM t"))
+
+
+@unittest.skipIf(query_engine is None, f"query_engine unavailable: {IMPORT_ERROR}")
+class SqlEndTest(unittest.TestCase):
+    def test_semicolon_inside_literals_and_comments(self):
+        self.assertEqual(query_engine._sql_end('SELECT ";" FROM t'), -1)
+        self.assertEqual(query_engine._sql_end("SELECT 'a\\';' /* ; */"), -1)
+        text = "SELECT `x;` FROM t -- ;\n; trailing prose"
+        self.assertEqual(text[:query_engine._sql_end(text)], "SELECT `x;` FROM t -- ;\n;")
+
+    def test_fenced_reply(self):
+        self.assertEqual(query_engine._sql_end("```sql\nSELECT 1"), -1)
+        self.assertEqual(query_engine._sql_end("```sql\nSELECT 1;"), len("```sql\nSELECT 1;"))
+        text = "```sql\nSELECT 1\n``` done"
+        self.assertEqual(query_engine._sql_end(text), len("```sql\nSELECT 1\n```"))
+
+
+@unittest.skipIf(query_engine is None, f"query_engine unavailable: {IMPORT_ERROR}")
+class RememberSqlTest(unittest.TestCase):
+    def setUp(self):
+        # Only the NL cache state is needed; skip the API key and schema setup
+        self.engine = object.__new__(query_engine.OpenAISQLEngine)
+        self.engine._nl_cache = OrderedDict()
+        self.engine._nl_db = None
+
+    def test_value_found_once_becomes_template(self):
+        self.engine._remember_sql("customer {n1}", [("{n1}", "7")], "SELECT * FROM customers WHERE id = 7")
+        self.assertEqual(self.engine._nl_cache, {"customer {n1}": "SELECT * FROM customers WHERE id = {n1}"})
+        self.assertEqual(
+            self.engine._cached_sql("customer {n1}", [("{n1}", "9")]),
+            "SELECT * FROM customers WHERE id = 9"
+        )
+
+    def test_repeated_value_is_cached_for_exact_query_only(self):
+        sql = "SELECT * FROM customers WHERE id = 1 LIMIT 1"
+        self.engine._remember_sql("customer {n1}", [("{n1}", "1")], sql)
+        self.assertEqual(self.engine._nl_cache, {"customer {n1}\x001": sql})
+        self.assertIsNone(self.engine._cached_sql("customer {n1}", [("{n1}", "2")]))
+
+    def remember_name_template(self):
+        self.engine._remember_sql(
+            "customers named {e1}", [("{e1}", "Smith")], "SELECT * FROM customers WHERE name = 'Smith'"
+        )
+        self.assertEqual(self.engine._nl_cache, {"customers named {e1}": "SELECT * FROM customers WHERE name = '{e1}'"})
+
+    def test_quote_in_value_is_escaped(self):
+        self.remember_name_template()
+        self.assertEqual(
+            self.engine._cached_sql("customers named {e1}", [("{e1}", "O'Brien")]),
+            "SELECT * FROM customers WHERE name = 'O''Brien'"
+        )
+
+    def test_injected_predicate_stays_inside_the_literal(self):
+        self.remember_name_template()
+        sql = self.engine._cached_sql("customers named {e1}", [("{e1}", "x' OR '1'='1")])
+        self.assertEqual(sql, "SELECT * FROM customers WHERE name = 'x'' OR ''1''=''1'")
+        self.assertNotIn("OR", [token for token, _ in query_engine.sql_tokens(sql)])
+
+    def test_value_holding_a_placeholder_is_not_filled_again(self):
+        self.engine._remember_sql(
+            "{e1} with more than {n2}", [("{e1}", "Smith"), ("{n2}", "5")],
+            "SELECT * FROM orders WHERE name = 'Smith' AND qty > 5"
+        )
+        self.assertEqual(
+            self.engine._cached_sql("{e1} with more than {n2}", [("{e1}", "{n2}"), ("{n2}", "6")]),
+            "SELECT * FROM orders WHERE name = '{n2}' AND qty > 6"
+        )
+
+    def test_bare_slot_rejects_non_numbers_and_quoted_values_are_not_templated(self):
+        self.test_value_found_once_becomes_template()
+        self.assertIsNone(self.engine._cached_sql("customer {n1}", [("{n1}", "1 OR 1=1")]))
+        self.engine._nl_cache.clear()
+        sql = "SELECT * FROM customers WHERE name = 'O''Brien'"
+        self.engine._remember_sql("customers named {e1}", [("{e1}", "O'Brien")], sql)
+        self.assertEqual(self.engine._nl_cache, {"customers named {e1}\x00O'Brien": sql})
+
+
+@unittest.skipIf(query_engine is None, f"query_engine unavailable: {IMPORT_ERROR}")
+class SchemaFileTest(unittest.TestCase):
+    def test_round_trip_and_unreadable_file(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, "schema.json")
+            with mock.patch.object(query_engine, "SCHEMA_CACHE_FILE", path):
+                entries = {"u@h:3306/db": [1.5, {"t": [{"name": "id", "type": "int"}]}]}
+                query_engine._save_schema_file(entries)
+                self.assertEqual(query_engine._load_schema_file(), entries)
+
+                with open(path, "wb") as f:
+                    f.write(b"\x80\x04not json")
+                self.assertEqual(query_engine._load_schema_file(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
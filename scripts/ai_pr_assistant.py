@@ -4,14 +4,32 @@
 AI PR Assistant: Generate code review and a PR description.
 """
 
+import argparse
+import hashlib
+import io
+import json
 import os
 import re
 import sys
-from typing import List, Tuple
-
-from github import Github
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from openai import OpenAI
 
+try:
+    import tiktoken
+except ImportError:  # optional: without it only the MAX_DIFF_CHARS cap applies
+    tiktoken = None
+
 # ---------------------------
 # Env & Config
 # ---------------------------
@@ -24,81 +42,403 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 REPO_NAME = os.environ.get("GITHUB_REPOSITORY")
 PR_NUMBER = os.environ.get("PR_NUMBER")
 
-if not GITHUB_TOKEN:
-    exit_now("Missing github token environment variable PR_TOKEN.")
-if not OPENAI_API_KEY:
-    exit_now("Missing OPENAI_API_KEY.")
-if not REPO_NAME:
-    exit_now("Missing GITHUB_REPOSITORY (expected '<owner>/<repo>').")
-if not PR_NUMBER:
-    exit_now("Missing PR_NUMBER.")
+def check_env():
+    if not GITHUB_TOKEN:
+        exit_now("Missing github token environment variable PR_TOKEN.")
+    if not OPENAI_API_KEY:
+        exit_now("Missing OPENAI_API_KEY.")
+    if not REPO_NAME:
+        exit_now("Missing GITHUB_REPOSITORY (expected '<owner>/<repo>').")
 
 MODEL = os.environ.get("OAI_MODEL", "gpt-4o-mini")
 MAX_DIFF_CHARS = int(os.environ.get("MAX_DIFF_CHARS", "20000"))
+MAX_DIFF_TOKENS = int(os.environ.get("MAX_DIFF_TOKENS", "6000"))
 ENABLE_REVIEW = os.environ.get("ENABLE_REVIEW", "true").lower() == "true"
 ENABLE_DESCRIPTION = os.environ.get("ENABLE_DESCRIPTION", "true").lower() == "true"
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", "30"))
+# The SDK retries only connection errors, 408/409/429 and 5xx, with exponential backoff
+OPENAI_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", "4"))
+# Output caps; they bound generation time as well as cost
+DESC_MAX_TOKENS = int(os.environ.get("DESC_MAX_TOKENS", "1200"))
+REVIEW_MAX_TOKENS = int(os.environ.get("REVIEW_MAX_TOKENS", "2000"))
+ENABLE_RESPONSE_CACHE = os.environ.get("ENABLE_RESPONSE_CACHE", "true").lower() == "true"
+RESPONSE_CACHE_DIR = os.environ.get("RESPONSE_CACHE_DIR", os.path.join(".cache", "ai_pr"))
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+ETAG_CACHE_DIR = os.environ.get("ETAG_CACHE_DIR", os.path.join(".cache", "etag"))
+# Files kept per cache directory; older and expired ones are pruned each run
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "500"))
+# PRs handled at once by --pr; each one runs up to two completions in parallel
+MAX_CONCURRENT_PRS = int(os.environ.get("MAX_CONCURRENT_PRS", "4"))
 
 # Marker block in PR body to make updates idempotent
 DESC_MARKER_BEGIN = "<!-- AI_PR_DESC_BEGIN -->"
 DESC_MARKER_END = "<!-- AI_PR_DESC_END -->"
 
+_LINKED_ISSUE_RE = re.compile(r"(#\d+|[A-Z]{2,}-\d+)")
+# Commits that add nothing to a description: merges and autosquash fixups
+_NOISE_COMMIT_RE = re.compile(r"^(?:Merge (?:branch|pull request|remote-tracking branch)\b|(?:fixup|squash)! )")
+_WHITESPACE_RE = re.compile(r"\s+")
+COMMIT_BODY_CHARS = 200
+MAX_COMMIT_CHARS = int(os.environ.get("MAX_COMMIT_CHARS", "4000"))
+# Below this much cleaned commit text (and with no diff) the description isn't generated
+MIN_COMMIT_CHARS = 40
+
+GITHUB_API = "https://api.github.com"
+DIFF_TRUNCATED_NOTE = "\n# [diff truncated]\n"
+OMITTED_FILES_LISTED = 20
+
+# Clients are created on first use so the module can be imported in-process
+_oai = None
+_http = None
+# run() reaches these from worker threads as well as the main thread
+_client_lock = threading.Lock()
+
+def github_retry() -> Retry:
+    """
+    Backoff for transient GitHub errors.
+    
+    PATCH is retried too: the description edit sends the whole body, so
+    repeating it is harmless. POST is not, so a comment is never posted twice.
+    """
+    return Retry(
+        total=4,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"PATCH"},
+    )
 
-gh = Github(GITHUB_TOKEN)
-try:
-    repo = gh.get_repo(REPO_NAME)
-    pr = repo.get_pull(int(PR_NUMBER))
-except Exception as e:
-    exit_now(f"Failed to access repository '{REPO_NAME}': {e}")
+def github_session(token: str) -> requests.Session:
+    """New keep-alive GitHub session with the retry policy above; close it (or use `with`) when done."""
+    session = requests.Session()
+    session.headers.update({
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+    })
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=github_retry()))
+    return session
+
+def get_http_session(session: Optional[requests.Session] = None) -> requests.Session:
+    """
+    Keep-alive session shared by every GitHub REST and GraphQL call.
+    
+    A session passed in (see run) becomes the shared one; a session of our
+    own is only built when none was given.
+    """
+    global _http
+    with _client_lock:
+        if session is not None:
+            _http = session
+        elif _http is None:
+            _http = github_session(GITHUB_TOKEN)
+        return _http
+
+def get_openai_client() -> OpenAI:
+    global _oai
+    with _client_lock:
+        if _oai is None:
+            _oai = OpenAI(api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES)
+        return _oai
+
+def github_paginate(url: str) -> Iterator[Dict]:
+    """Yield every item of a paginated GitHub REST listing, 100 per page."""
+    params = {"per_page": 100}
+    while url:
+        resp = get_http_session().get(url, params=params, timeout=30)
+        resp.raise_for_status()
+        yield from resp.json()
+        url = resp.links.get("next", {}).get("url")
+        params = None  # the next link already carries the query string
+
+# The file fields the diff and summary builders read
+PrFile = namedtuple("PrFile", "filename status additions deletions patch")
+
+class PullRequest:
+    """The parts of a GitHub pull request this script reads and writes."""
+
+    def __init__(self, data: Dict):
+        self.number = data["number"]
+        self.title = data.get("title") or ""
+        self.body = data.get("body") or ""
+        self.head_ref = data["head"]["ref"]
+        self.base_ref = data["base"]["ref"]
+        self.label_names = [l["name"] for l in data.get("labels") or []]
+        self.url = f"{GITHUB_API}/repos/{REPO_NAME}/pulls/{self.number}"
+
+    def edit(self, body: str):
+        resp = get_http_session().patch(self.url, json={"body": body}, timeout=30)
+        resp.raise_for_status()
+        self.body = body
+
+    def create_issue_comment(self, text: str):
+        resp = get_http_session().post(
+            f"{GITHUB_API}/repos/{REPO_NAME}/issues/{self.number}/comments", json={"body": text}, timeout=30
+        )
+        resp.raise_for_status()
 
-oai = OpenAI(api_key=OPENAI_API_KEY)
+    def get_files(self) -> Iterator[PrFile]:
+        for f in github_paginate(f"{self.url}/files"):
+            yield PrFile(f["filename"], f.get("status"), f.get("additions", 0), f.get("deletions", 0), f.get("patch"))
+
+    def get_commit_messages(self) -> Iterator[str]:
+        for c in github_paginate(f"{self.url}/commits"):
+            yield c["commit"]["message"]
+
+def load_pull(pr_number: int) -> PullRequest:
+    """Fetch the pull request `pr_number`."""
+    try:
+        resp = get_http_session().get(f"{GITHUB_API}/repos/{REPO_NAME}/pulls/{pr_number}", timeout=30)
+        resp.raise_for_status()
+        return PullRequest(resp.json())
+    except (requests.RequestException, ValueError, KeyError) as e:
+        exit_now(f"Failed to access PR #{pr_number} in '{REPO_NAME}': {e}")
 
 
 def build_unified_diff(files: List, max_chars: int) -> str:
     """Create a unified-diff-like string from PR files with a brief header per file."""
-    parts = []
+    buf = io.StringIO()
+    omitted = []
     for f in files:
-        header = f"--- a/{f.filename}\n+++ b/{f.filename}\n"
-        summary = f"# changes: status={f.status} additions={f.additions} deletions={f.deletions}\n"
-        patch = f.patch or ""  # GitHub may omit large/binary patches
-        parts.append(header + summary + patch + "\n")
-    combined = "\n".join(parts).strip()
+        # GitHub omits patches for binary/very large files; a bare header would
+        # only use up the budget, so list those by name after the diff instead
+        if not f.patch:
+            omitted.append(f.filename)
+            continue
+        if buf.tell():
+            buf.write("\n")
+        buf.write(f"--- a/{f.filename}\n+++ b/{f.filename}\n")
+        buf.write(f"# changes: status={f.status} additions={f.additions} deletions={f.deletions}\n")
+        buf.write(f.patch)
+        buf.write("\n")
+        # Everything past max_chars is cut anyway, so stop building
+        if buf.tell() > max_chars:
+            break
+    combined = buf.getvalue().strip()
     if not combined:
         return ""
     if len(combined) > max_chars:
-        combined = combined[:max_chars] + "\n# [diff truncated]\n"
+        combined = combined[:max_chars] + DIFF_TRUNCATED_NOTE
+    if omitted:
+        shown = ", ".join(omitted[:OMITTED_FILES_LISTED])
+        more = f" and {len(omitted) - OMITTED_FILES_LISTED} more" if len(omitted) > OMITTED_FILES_LISTED else ""
+        combined += f"\n# files without a patch (binary or too large): {shown}{more}\n"
     return combined
 
+def write_json_file(path: str, obj):
+    """Write `obj` as JSON, atomically, creating the directory if needed."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # A unique temp file per call: threads of one process may write the same key
+    f = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False)
+    try:
+        with f:
+            json.dump(obj, f)
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+def load_etag_entry(path: str) -> Dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def fetch_pr_diff(pr_number: int, max_chars: int) -> str:
+    """
+    Fetch the whole PR as one unified diff, reading at most `max_chars` of it.
+    
+    The diff and its ETag are kept under ETAG_CACHE_DIR; a rerun on an
+    unchanged PR sends If-None-Match and reuses it on 304, which GitHub does
+    not count against the rate limit.
+    
+    Returns '' if GitHub will not render the diff (e.g. it is too large), so
+    the caller can fall back to the per-file patches.
+    """
+    url = f"{GITHUB_API}/repos/{REPO_NAME}/pulls/{pr_number}"
+    etag_path = os.path.join(ETAG_CACHE_DIR, hashlib.sha256(f"{url}|diff".encode("utf-8")).hexdigest() + ".json")
+    cached = load_etag_entry(etag_path)
+    headers = {"Accept": "application/vnd.github.diff"}
+    if cached.get("etag") and cached.get("max_chars") == max_chars:
+        headers["If-None-Match"] = cached["etag"]
+    try:
+        with get_http_session().get(url, headers=headers, stream=True, timeout=30) as resp:
+            if resp.status_code == 304:
+                print("PR diff unchanged since last run; using cached copy.")
+                return cached["diff"]
+            resp.raise_for_status()
+            etag = resp.headers.get("ETag")
+            buf = bytearray()
+            truncated = False
+            # UTF-8 needs at most 4 bytes per character, so this many bytes always covers max_chars
+            for chunk in resp.iter_content(chunk_size=8192):
+                buf += chunk
+                if len(buf) >= 4 * max_chars:
+                    truncated = True
+                    break
+    except requests.RequestException as e:
+        print(f"Could not fetch PR diff, using per-file patches: {e}")
+        return ""
+    diff = buf.decode("utf-8", errors="replace").strip()
+    if truncated or len(diff) > max_chars:
+        diff = diff[:max_chars] + DIFF_TRUNCATED_NOTE
+    if etag and diff:
+        try:
+            write_json_file(etag_path, {"etag": etag, "max_chars": max_chars, "diff": diff})
+        except OSError as e:
+            print(f"Could not write ETag cache: {e}")
+    return diff
+
+@lru_cache(maxsize=1)
+def get_token_encoder():
+    """tiktoken encoding for MODEL, or None if tiktoken is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # the encoding files are downloaded on first use
+        print(f"tiktoken unavailable, truncating diff by characters only: {e}")
+        return None
+
+def truncate_to_token_budget(diff: str, max_tokens: int) -> str:
+    """Cut `diff` to at most `max_tokens` model tokens, since that is what the prompt is billed and limited by."""
+    enc = get_token_encoder()
+    if enc is None or not diff:
+        return diff
+    tokens = enc.encode(diff, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return diff
+    return enc.decode(tokens[:max_tokens]).rstrip() + DIFF_TRUNCATED_NOTE
+
+COMMITS_QUERY = """
+query($owner: String!, $repo: String!, $number: Int!, $cursor: String) {
+  repository(owner: $owner, name: $repo) {
+    pullRequest(number: $number) {
+      commits(first: 100, after: $cursor) {
+        nodes { commit { message } }
+        pageInfo { hasNextPage endCursor }
+      }
+    }
+  }
+}
+"""
+
+def clean_commit_messages(messages: Iterable[str], max_chars: int) -> str:
+    """
+    Normalize, filter and shorten commit messages for the prompt.
+    
+    Drops merge/fixup commits and duplicates, keeps each subject plus the first
+    COMMIT_BODY_CHARS of its body, and stops at `max_chars` with a count of the
+    commits left out. Works in one pass, so `messages` can be a lazy iterator.
+    """
+    seen = set()
+    kept = []
+    used = 0
+    left_out = 0
+    for message in messages:
+        message = unicodedata.normalize("NFKC", message).strip()
+        if not message or _NOISE_COMMIT_RE.match(message):
+            continue
+        subject, _, body = message.partition("\n")
+        body = _WHITESPACE_RE.sub(" ", body).strip()[:COMMIT_BODY_CHARS]
+        message = f"{subject.strip()}\n{body}" if body else subject.strip()
+        if message in seen:
+            continue
+        seen.add(message)
+        if left_out or (kept and used + len(message) + 1 > max_chars):
+            left_out += 1
+            continue
+        kept.append(message)
+        used += len(message) + 1
+    if left_out:
+        kept.append(f"... {left_out} more commits")
+    return "\n".join(kept)
+
+def fetch_commit_messages(pr_obj) -> str:
+    """
+    All commit messages of the PR, joined by newlines.
+    
+    Uses one GraphQL request per 100 commits; falls back to the REST listing
+    if GraphQL fails, and to '' if that fails as well.
+    """
+    owner, repo = REPO_NAME.split("/", 1)
+    variables = {"owner": owner, "repo": repo, "number": pr_obj.number, "cursor": None}
+    messages = []
+    try:
+        while True:
+            resp = get_http_session().post(
+                f"{GITHUB_API}/graphql",
+                json={"query": COMMITS_QUERY, "variables": variables},
+                timeout=30,
+            )
+            resp.raise_for_status()
+            payload = resp.json()
+            if payload.get("errors"):
+                raise ValueError(payload["errors"][0].get("message", "GraphQL error"))
+            commits = payload["data"]["repository"]["pullRequest"]["commits"]
+            messages.extend(node["commit"]["message"] for node in commits["nodes"])
+            if not commits["pageInfo"]["hasNextPage"]:
+                break
+            variables["cursor"] = commits["pageInfo"]["endCursor"]
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        print(f"GraphQL commit fetch failed, using REST: {e}")
+    else:
+        return clean_commit_messages(messages, MAX_COMMIT_CHARS)
+    # The REST listing is lazy, so it has to be consumed inside the try
+    try:
+        return clean_commit_messages(pr_obj.get_commit_messages(), MAX_COMMIT_CHARS)
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        print(f"REST commit fetch failed too; continuing without commit messages: {e}")
+        return ""
+
 def build_file_summaries(files: List) -> str:
     """Minimal per-file summary for when no line patches are available."""
     if not files:
         return ""
-    lines = []
-    for f in files:
+    buf = io.StringIO()
+    for i, f in enumerate(files):
         status = (f.status or "").lower()
         tag = "NEW FILE" if status == "added" else status
-        lines.append(f"- {f.filename} ({tag}; additions={f.additions}, deletions={f.deletions})")
-    return "\n".join(lines)
+        if i:
+            buf.write("\n")
+        buf.write(f"- {f.filename} ({tag}; additions={f.additions}, deletions={f.deletions})")
+    return buf.getvalue()
 
 def extract_linked_issue_tokens(body: str) -> str:
     """Extract '#123' or 'ABC-123' tokens from PR body for context."""
     if not body:
         return "none"
-    tokens = re.findall(r"(#\d+|[A-Z]{2,}-\d+)", body)
+    tokens = _LINKED_ISSUE_RE.findall(body)
     return ", ".join(tokens) if tokens else "none"
 
-def gather_pr_context(pr_obj) -> Tuple[str, str, str, str, str, str, str]:
-    """Collect PR metadata and change signals."""
+def gather_pr_context(pr_obj, diff_snippet: Optional[str] = None) -> Tuple[str, str, str, str, str, str, str, str]:
+    """Collect PR metadata and change signals; `diff_snippet` may be prefetched."""
     pr_title = pr_obj.title or ""
-    pr_branch = pr_obj.head.ref
-    base_branch = pr_obj.base.ref
-    labels = ", ".join([l.name for l in pr_obj.get_labels()]) if pr_obj.get_labels() else "none"
+    pr_branch = pr_obj.head_ref
+    base_branch = pr_obj.base_ref
+    # Labels come with the PR payload; no extra request needed
+    labels = ", ".join(pr_obj.label_names) or "none"
     linked_issues_text = extract_linked_issue_tokens(pr_obj.body)
 
-    files = list(pr_obj.get_files())
-    has_file_entries = len(files) > 0
-    diff_snippet = build_unified_diff(files, MAX_DIFF_CHARS) if has_file_entries else ""
-    file_summaries = build_file_summaries(files) if has_file_entries else ""
-    commit_messages = "\n".join([c.commit.message for c in pr_obj.get_commits()]).strip()
+    # One request for the full diff instead of paging through the file list
+    if diff_snippet is None:
+        diff_snippet = fetch_pr_diff(pr_obj.number, MAX_DIFF_CHARS)
+    file_summaries = ""
+    if not diff_snippet:
+        files = list(pr_obj.get_files())
+        has_file_entries = len(files) > 0
+        diff_snippet = build_unified_diff(files, MAX_DIFF_CHARS) if has_file_entries else ""
+        file_summaries = build_file_summaries(files) if has_file_entries else ""
+    diff_snippet = truncate_to_token_budget(diff_snippet, MAX_DIFF_TOKENS)
+
+    # The prompts only fall back to commit messages when there is no diff or
+    # file list, so only page through the commits in that case
+    commit_messages = ""
+    if not diff_snippet and not file_summaries:
+        commit_messages = fetch_commit_messages(pr_obj)
 
     return pr_title, pr_branch, base_branch, labels, linked_issues_text, diff_snippet, file_summaries, commit_messages
 
@@ -106,39 +446,116 @@ def upsert_block(original: str, content: str, begin_marker: str, end_marker: str
     """Insert or replace a marked block in the PR body."""
     if original is None:
         original = ""
-    pattern = re.compile(
-        re.escape(begin_marker) + r".*?" + re.escape(end_marker),
-        flags=re.DOTALL,
-    )
     block = f"{begin_marker}\n{content}\n{end_marker}"
-    if pattern.search(original):
-        return pattern.sub(block, original)
+    # The markers are literals, so plain substring search finds them
+    begin = original.find(begin_marker)
+    if begin != -1:
+        end = original.find(end_marker, begin + len(begin_marker))
+        if end != -1:
+            return original[:begin] + block + original[end + len(end_marker):]
     # append with separator if body exists
     sep = "\n\n---\n\n" if original.strip() else ""
     return original + sep + block
 
-def call_openai(prompt: str) -> str:
-    """Call OpenAI Chat Completions API with consistent settings."""
+def response_cache_path(messages: List[Dict[str, str]], max_tokens: int) -> str:
+    """Cache file for a completion, keyed on the model, output cap and exact messages."""
+    payload = json.dumps([MODEL, max_tokens, messages], sort_keys=True, ensure_ascii=False)
+    return os.path.join(RESPONSE_CACHE_DIR, hashlib.sha256(payload.encode("utf-8")).hexdigest() + ".json")
+
+def load_cached_response(path: str) -> str:
+    """Return a cached completion younger than RESPONSE_CACHE_TTL, or ''."""
+    try:
+        if time.time() - os.path.getmtime(path) > RESPONSE_CACHE_TTL:
+            return ""
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("content", "")
+    except (OSError, ValueError):
+        return ""
+
+def save_cached_response(path: str, content: str):
+    try:
+        write_json_file(path, {"model": MODEL, "content": content})
+    except OSError as e:
+        print(f"Could not write response cache: {e}")
+
+def prune_cache_dir(directory: str, max_age: int, max_entries: int):
+    """
+    Delete files older than `max_age` seconds, then the oldest beyond `max_entries`.
+    
+    The workflow saves the cache directories after every run and restores
+    them by prefix, so without pruning they only ever grow.
+    """
+    try:
+        paths = [entry.path for entry in os.scandir(directory) if entry.is_file()]
+    except OSError:
+        return
+    entries = []
+    for path in paths:
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:  # removed meanwhile by another run in this process
+            pass
+    entries.sort(reverse=True)
+    cutoff = time.time() - max_age
+    for index, (mtime, path) in enumerate(entries):
+        if index >= max_entries or mtime < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def prune_caches():
+    """Expire and cap the response and ETag caches before the workflow saves them."""
+    prune_cache_dir(RESPONSE_CACHE_DIR, RESPONSE_CACHE_TTL, CACHE_MAX_ENTRIES)
+    prune_cache_dir(ETAG_CACHE_DIR, RESPONSE_CACHE_TTL, CACHE_MAX_ENTRIES)
+
+def call_openai(messages: List[Dict[str, str]], max_tokens: int) -> str:
+    """Call OpenAI Chat Completions API with consistent settings, reusing cached replies."""
+    cache_path = response_cache_path(messages, max_tokens) if ENABLE_RESPONSE_CACHE else None
+    if cache_path:
+        cached = load_cached_response(cache_path)
+        if cached:
+            print("Using cached OpenAI response.")
+            return cached
+    # Streamed so the socket never sits idle for the whole generation (the
+    # client timeout then applies between chunks) and first-token latency is logged
+    started = time.monotonic()
+    parts = []
     try:
-        resp = oai.chat.completions.create(
+        stream = get_openai_client().chat.completions.create(
             model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
+            messages=messages,
             temperature=0.2,
+            max_tokens=max_tokens,
+            stream=True,
         )
-        return (resp.choices[0].message.content or "").strip()
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not parts:
+                    print(f"OpenAI first token after {time.monotonic() - started:.1f}s")
+                parts.append(delta)
     except Exception as e:
         print(f"OpenAI API call failed: {e}")
         return ""
+    content = "".join(parts).strip()
+    print(f"OpenAI response complete after {time.monotonic() - started:.1f}s")
+    if cache_path and content:
+        save_cached_response(cache_path, content)
+    return content
 
 # ---------------------------
 # Prompts for both code review and description
 # ---------------------------
-def make_review_prompt(pr_title, pr_branch, base_branch, labels, linked, diff_snippet, file_summaries, commit_messages) -> str:
-    if diff_snippet:
-        return f"""
+# The instructions are fixed text sent as the system message, and everything
+# PR-specific goes in the user message after it. Identical leading tokens on
+# every run let OpenAI's automatic prefix caching reuse them.
+REVIEW_DIFF_INSTRUCTIONS = """
 You are a senior software engineer performing a code review.
 
-Review the following DIFF and provide:
+Review the DIFF in the user message and provide:
 1. High-level feedback
 2. Potential bugs or logical issues
 3. Security concerns
@@ -147,27 +564,16 @@ Review the following DIFF and provide:
 6. Suggestions for improvement
 7. Any missing tests or validation
 
-PR Context:
-- Title: {pr_title}
-- Branch: {pr_branch} → Base: {base_branch}
-- Labels: {labels}
-- Linked issues: {linked}
-
-Unified Diff (may be truncated):
-{diff_snippet}
-
 Rules:
 - Base your review ONLY on the diff.
 - Be specific and actionable.
 - Do not rewrite code unless needed to illustrate a fix.
 """.strip()
-    if file_summaries:
-        return f"""
-You are a senior software engineer performing a code review.
 
-No line-level diff is available. Review the PR based on the file-level changes:
+REVIEW_FILES_INSTRUCTIONS = """
+You are a senior software engineer performing a code review.
 
-{file_summaries}
+No line-level diff is available. Review the PR based on the file-level changes in the user message.
 
 Provide:
 - Potential risks
@@ -178,13 +584,11 @@ Provide:
 
 Do not invent code details beyond filenames.
 """.strip()
-    if commit_messages:
-        return f"""
-You are a senior software engineer performing a code review.
 
-No file diffs were available. Review based on commit messages:
+REVIEW_COMMITS_INSTRUCTIONS = """
+You are a senior software engineer performing a code review.
 
-{commit_messages}
+No file diffs were available. Review based on the commit messages in the user message.
 
 Provide:
 - Risks
@@ -192,25 +596,13 @@ Provide:
 - Architecture concerns
 - Any red flags
 """.strip()
-    return "No diff, file summaries, or commit messages available. Provide a concise, generic review checklist."
 
-def make_description_prompt(pr_title, pr_branch, base_branch, labels, linked, diff_snippet, file_summaries, commit_messages) -> str:
-    if diff_snippet:
-        return f"""
+DESC_DIFF_INSTRUCTIONS = """
 You are an expert software engineer and technical writer.
 
-Write a concise and informative pull request description based on the DIFF below.
+Write a concise and informative pull request description based on the DIFF in the user message.
 Prioritize what changed and why. Use clear, scannable bullet points.
 
-PR Context:
-- Title: {pr_title}
-- Branch: {pr_branch} → Base: {base_branch}
-- Labels: {labels}
-- Linked issues: {linked}
-
-Unified Diff (truncated if too long):
-{diff_snippet}
-
 Sections required:
 * Purpose
 * Changes
@@ -220,22 +612,15 @@ Sections required:
   - Note where to add local testing screenshots
 
 Rules:
-- Base summary only on the diff and PR metadata above.
+- Base summary only on the diff and PR metadata provided.
 - If anything is unknown, state it explicitly.
 - Keep bullets short; avoid long paragraphs.
 """.strip()
-    if file_summaries:
-        return f"""
-You are an expert software engineer and technical writer.
 
-No line-level diff is available, but the PR includes these file changes:
-{file_summaries}
+DESC_FILES_INSTRUCTIONS = """
+You are an expert software engineer and technical writer.
 
-PR Context:
-- Title: {pr_title}
-- Branch: {pr_branch} → Base: {base_branch}
-- Labels: {labels}
-- Linked issues: {linked}
+No line-level diff is available; the user message lists the PR's file changes.
 
 Write a concise PR description with:
 * Purpose
@@ -248,12 +633,11 @@ Rules:
 - Do not invent code details beyond what filenames/paths imply.
 - Use short bullet points.
 """.strip()
-    if commit_messages:
-        return f"""
+
+DESC_COMMITS_INSTRUCTIONS = """
 You are an expert software engineer and technical writer.
 
-No file diffs were available for this PR. Use the commit messages below:
-{commit_messages}
+No file diffs were available for this PR. Use the commit messages in the user message.
 
 Produce a concise PR description with:
 * Purpose
@@ -265,7 +649,8 @@ Rules:
 - Stay faithful to commit messages; do not speculate beyond them.
 - Use bullet points; avoid long paragraphs.
 """.strip()
-    return """\
+
+DESC_EMPTY_TEMPLATE = """\
 **Purpose**
 - _[Describe the problem this PR solves and why now.]_
 
@@ -278,39 +663,146 @@ Rules:
 **Testing**
 - _[Steps to test locally/CI, commands, sample payloads; add screenshots as needed.]_"""
 
+def pr_context_block(pr_title, pr_branch, base_branch, labels, linked) -> str:
+    return f"""PR Context:
+- Title: {pr_title}
+- Branch: {pr_branch} → Base: {base_branch}
+- Labels: {labels}
+- Linked issues: {linked}"""
+
+def chat_messages(instructions: str, content: str) -> List[Dict[str, str]]:
+    """Static instructions first, PR-specific content last."""
+    return [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": content},
+    ]
 
-def main():
-    pr_title, pr_branch, base_branch, labels, linked, diff_snippet, file_summaries, commit_messages = (
-        gather_pr_context(pr)
-    )
+def make_review_prompt(pr_title, pr_branch, base_branch, labels, linked, diff_snippet, file_summaries, commit_messages) -> List[Dict[str, str]]:
+    if diff_snippet:
+        context = pr_context_block(pr_title, pr_branch, base_branch, labels, linked)
+        return chat_messages(REVIEW_DIFF_INSTRUCTIONS, f"{context}\n\nUnified Diff (may be truncated):\n{diff_snippet}")
+    if file_summaries:
+        return chat_messages(REVIEW_FILES_INSTRUCTIONS, file_summaries)
+    if commit_messages:
+        return chat_messages(REVIEW_COMMITS_INSTRUCTIONS, commit_messages)
+    return [{"role": "user", "content": "No diff, file summaries, or commit messages available. Provide a concise, generic review checklist."}]
 
-    if ENABLE_DESCRIPTION:
-        desc_prompt = make_description_prompt(
-            pr_title, pr_branch, base_branch, labels, linked,
-            diff_snippet, file_summaries, commit_messages
-        )
-        ai_desc = call_openai(desc_prompt)
-        if ai_desc:
+def make_description_prompt(pr_title, pr_branch, base_branch, labels, linked, diff_snippet, file_summaries, commit_messages) -> List[Dict[str, str]]:
+    if diff_snippet:
+        context = pr_context_block(pr_title, pr_branch, base_branch, labels, linked)
+        return chat_messages(DESC_DIFF_INSTRUCTIONS, f"{context}\n\nUnified Diff (truncated if too long):\n{diff_snippet}")
+    if file_summaries:
+        context = pr_context_block(pr_title, pr_branch, base_branch, labels, linked)
+        return chat_messages(DESC_FILES_INSTRUCTIONS, f"{context}\n\nFile changes:\n{file_summaries}")
+    if commit_messages:
+        return chat_messages(DESC_COMMITS_INSTRUCTIONS, commit_messages)
+    return [{"role": "user", "content": DESC_EMPTY_TEMPLATE}]
+
+
+def run(pr_number: int, description: bool = ENABLE_DESCRIPTION, review: bool = ENABLE_REVIEW,
+        session: Optional[requests.Session] = None):
+    """
+    Generate the AI description and/or review for PR `pr_number`.
+    
+    `session` lets an in-process caller share its GitHub session (and its
+    open connections); without one the module builds its own.
+    """
+    check_env()
+    get_http_session(session)
+    prune_caches()
+    # The diff request needs only the PR number, so it runs while the PR
+    # object itself is being fetched
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        diff_future = pool.submit(fetch_pr_diff, pr_number, MAX_DIFF_CHARS)
+        pr = load_pull(pr_number)
+        context = gather_pr_context(pr, diff_future.result())
+
+    # The two completions are independent; request them together. The
+    # description worker also writes the PR body as soon as its text is
+    # back, so that edit overlaps the review instead of delaying the comment.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        desc_future = pool.submit(generate_description, pr, context) if description else None
+        review_future = pool.submit(call_openai, make_review_prompt(*context), REVIEW_MAX_TOKENS) if review else None
+
+        if review_future is not None:
+            post_review(pr, review_future.result())
+        if desc_future is not None:
+            desc_future.result()
+
+def generate_description(pr, context: Tuple):
+    diff_snippet, file_summaries, commit_messages = context[5:]
+    # With no diff, no file list and next to no commit text, the model could
+    # only restate the placeholder template, so skip the call
+    if not diff_snippet and not file_summaries and len(commit_messages) < MIN_COMMIT_CHARS:
+        print("Nothing substantive to summarize; writing the description template.")
+        # One bullet per line: the cleaned text spans several lines, which inline markup can't
+        note = "".join(f"- {line}\n" for line in commit_messages.splitlines())
+        note = f"Commits:\n\n{note}\n" if note else ""
+        update_description(pr, note + DESC_EMPTY_TEMPLATE)
+        return
+    update_description(pr, call_openai(make_description_prompt(*context), DESC_MAX_TOKENS))
+
+def update_description(pr, ai_desc: str):
+    """Write the AI section into the PR body."""
+    if not ai_desc:
+        return
+    try:
+        new_body = upsert_block(pr.body or "", ai_desc, DESC_MARKER_BEGIN, DESC_MARKER_END)
+        pr.edit(body=new_body)
+        print("Updated PR description (AI section).")
+    except Exception as e:
+        print(f"Failed to update PR description: {e}")
+
+def post_review(pr, ai_review: str):
+    """Post the AI review as a PR comment."""
+    if not ai_review:
+        ai_review = "AI code review generation failed."
+
+    try:
+        pr.create_issue_comment(f"### AI Code Review\n\n{ai_review}")
+        print("Posted AI code review as PR comment.")
+    except Exception as e:
+        print(f"Failed to post AI review comment: {e}")
+
+def run_many(pr_numbers: List[int], description: bool = ENABLE_DESCRIPTION, review: bool = ENABLE_REVIEW) -> int:
+    """
+    Process several PRs in one process, at most MAX_CONCURRENT_PRS at a time.
+    
+    Returns the number of PRs that failed; a failure doesn't stop the others.
+    """
+    if len(pr_numbers) == 1:
+        run(pr_numbers[0], description=description, review=review)
+        return 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_PRS, len(pr_numbers))) as pool:
+        futures = {n: pool.submit(run, n, description, review) for n in pr_numbers}
+        for n, future in futures.items():
             try:
-                new_body = upsert_block(pr.body or "", ai_desc, DESC_MARKER_BEGIN, DESC_MARKER_END)
-                pr.edit(body=new_body)
-                print("Updated PR description (AI section).")
+                future.result()
+            except SystemExit:  # load_pull exits on an inaccessible PR, after printing why
+                print(f"PR #{n} skipped.")
+                failed += 1
             except Exception as e:
-                print(f"Failed to update PR description: {e}")
-    if ENABLE_REVIEW:
-        review_prompt = make_review_prompt(
-            pr_title, pr_branch, base_branch, labels, linked,
-            diff_snippet, file_summaries, commit_messages
-        )
-        ai_review = call_openai(review_prompt)
-        if not ai_review:
-            ai_review = "AI code review generation failed."
-
-        try:
-            pr.create_issue_comment(f"### AI Code Review\n\n{ai_review}")
-            print("Posted AI code review as PR comment.")
-        except Exception as e:
-            print(f"Failed to post AI review comment: {e}")
+                print(f"PR #{n} failed: {e}")
+                failed += 1
+    return failed
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate an AI code review and/or PR description.")
+    parser.add_argument("--review", action="store_true", help="Post the code review (default: ENABLE_REVIEW)")
+    parser.add_argument("--description", action="store_true", help="Update the PR description (default: ENABLE_DESCRIPTION)")
+    parser.add_argument("--pr", type=int, nargs="+", help="PR numbers to process (default: PR_NUMBER)")
+    args = parser.parse_args(argv)
+
+    pr_numbers = args.pr or ([int(PR_NUMBER)] if PR_NUMBER else [])
+    if not pr_numbers:
+        exit_now("Missing PR_NUMBER.")
+    if args.review or args.description:
+        failed = run_many(pr_numbers, description=args.description, review=args.review)
+    else:
+        failed = run_many(pr_numbers)
+    if failed:
+        exit_now(f"{failed} of {len(pr_numbers)} PRs failed.")
 
 if __name__ == "__main__":
     main()
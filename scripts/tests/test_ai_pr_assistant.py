@@ -0,0 +1,129 @@
+"""Tests for scripts/ai_pr_assistant.py (run with `python -m unittest discover scripts/tests`)."""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import ai_pr_assistant
+except ImportError as e:  # requests / openai not installed
+    ai_pr_assistant = None
+    IMPORT_ERROR = str(e)
+else:
+    IMPORT_ERROR = ""
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, links=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.links = links or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ai_pr_assistant.requests.HTTPError(f"{self.status_code} error")
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Answers GraphQL with `graphql` and REST GETs with the `pages` responses in order."""
+
+    def __init__(self, graphql, pages=()):
+        self.graphql = graphql
+        self.pages = list(pages)
+
+    def post(self, url, json=None, timeout=None):
+        return self.graphql
+
+    def get(self, url, params=None, timeout=None):
+        return self.pages.pop(0)
+
+
+@unittest.skipIf(ai_pr_assistant is None, f"ai_pr_assistant dependencies missing: {IMPORT_ERROR}")
+class FetchCommitMessagesTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(ai_pr_assistant, "REPO_NAME", "owner/repo")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self, session):
+        with mock.patch.object(ai_pr_assistant, "_http", session):
+            pr = ai_pr_assistant.PullRequest({"number": 7, "head": {"ref": "f"}, "base": {"ref": "main"}})
+            return ai_pr_assistant.fetch_commit_messages(pr)
+
+    def test_graphql_commits(self):
+        graphql = FakeResponse(payload={"data": {"repository": {"pullRequest": {"commits": {
+            "nodes": [{"commit": {"message": "Add parser"}}, {"commit": {"message": "Merge branch 'main'"}}],
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+        }}}}})
+        self.assertEqual(self.fetch(FakeSession(graphql)), "Add parser")
+
+    def test_rest_fallback_when_graphql_fails(self):
+        pages = [FakeResponse(payload=[{"commit": {"message": "Fix bug"}}])]
+        self.assertEqual(self.fetch(FakeSession(FakeResponse(status_code=502), pages)), "Fix bug")
+
+    def test_rest_pagination_failure_after_graphql_failure(self):
+        pages = [
+            FakeResponse(payload=[{"commit": {"message": "Fix bug"}}], links={"next": {"url": "https://api.github.com/next"}}),
+            FakeResponse(status_code=500),
+        ]
+        self.assertEqual(self.fetch(FakeSession(FakeResponse(status_code=502), pages)), "")
+
+
+@unittest.skipIf(ai_pr_assistant is None, f"ai_pr_assistant dependencies missing: {IMPORT_ERROR}")
+class PruneCacheDirTest(unittest.TestCase):
+    def test_removes_expired_then_oldest_entries(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            now = time.time()
+            for name, age in (("fresh", 10), ("older", 20), ("oldest", 30), ("expired", 1000)):
+                path = os.path.join(cache_dir, name + ".json")
+                open(path, "w").close()
+                os.utime(path, (now - age, now - age))
+
+            ai_pr_assistant.prune_cache_dir(cache_dir, max_age=100, max_entries=2)
+            self.assertEqual(sorted(os.listdir(cache_dir)), ["fresh.json", "older.json"])
+
+    def test_missing_directory_is_ignored(self):
+        ai_pr_assistant.prune_cache_dir("/nonexistent/ai_pr", max_age=100, max_entries=2)
+
+
+@unittest.skipIf(ai_pr_assistant is None, f"ai_pr_assistant dependencies missing: {IMPORT_ERROR}")
+class TrivialDescriptionTest(unittest.TestCase):
+    def test_commits_render_as_a_bullet_list(self):
+        context = (None,) * 5 + ("", [], "Fix typo\n... 2 more commits")
+        with mock.patch.object(ai_pr_assistant, "update_description") as update:
+            ai_pr_assistant.generate_description(mock.Mock(), context)
+        body = update.call_args[0][1]
+        self.assertTrue(body.startswith("Commits:\n\n- Fix typo\n- ... 2 more commits\n\n"))
+        self.assertNotIn("_", body.split(ai_pr_assistant.DESC_EMPTY_TEMPLATE)[0])
+
+
+@unittest.skipIf(ai_pr_assistant is None, f"ai_pr_assistant dependencies missing: {IMPORT_ERROR}")
+class WriteJsonFileTest(unittest.TestCase):
+    def test_threads_writing_one_key_do_not_collide(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, "key.json")
+
+            def write(n):
+                for _ in range(20):
+                    ai_pr_assistant.write_json_file(path, {"writer": n, "pad": "x" * 10000})
+            threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(os.listdir(cache_dir), ["key.json"])
+            self.assertEqual(len(ai_pr_assistant.load_etag_entry(path)["pad"]), 10000)
+
+
+if __name__ == "__main__":
+    unittest.main()